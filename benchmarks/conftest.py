@@ -0,0 +1,47 @@
+
+
+"""Fixtures of the Sunsa benchmarks."""
+
+
+from __future__ import annotations
+
+import os
+
+import pytest
+
+pytest_plugins = "pytest_homeassistant_custom_component"
+
+# Fleet sizes to benchmark, e.g. SUNSA_BENCH_WANDS=10,100,1000
+FLEET_SIZES = [
+    int(size) for size in os.environ.get("SUNSA_BENCH_WANDS", "10,100,1000").split(",")
+]
+
+RESULTS: list[tuple[str, int, float, str]] = []
+
+
+def record(metric: str, wands: int, value: float, unit: str) -> None:
+    """Record a benchmark result for the summary."""
+    RESULTS.append((metric, wands, value, unit))
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """Enable the custom integrations in every benchmark."""
+    yield
+
+
+@pytest.fixture(params=FLEET_SIZES, ids=lambda wands: f"{wands}_wands")
+def wands(request) -> int:
+    """Return the number of wands of the benchmarked account."""
+    return request.param
+
+
+def pytest_terminal_summary(terminalreporter) -> None:
+    """Print the benchmark results."""
+    if not RESULTS:
+        return
+    terminalreporter.section("Sunsa benchmarks")
+    for metric, wands, value, unit in RESULTS:
+        terminalreporter.write_line(
+            f"{metric:<36} {wands:>6} wands {value:>14.3f} {unit}"
+        )
@@ -0,0 +1,219 @@
+
+
+"""Local stand-in for the Sunsa cloud API used by the benchmarks."""
+
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+import random
+from time import monotonic
+from typing import Any
+
+from aiohttp import ClientSession, web
+
+from pysunsa.exceptions import PysunsaError
+
+
+@dataclass
+class MockSunsaCloud:
+    """Simulated Sunsa account with a fleet of wands.
+
+    Every request waits `latency` plus up to `jitter` seconds, fails with a 500
+    error with probability `error_rate`, and fails with a 429 error when more than
+    `max_requests_per_second` requests were received in the last second.
+    """
+
+    wands: int = 10
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    max_requests_per_second: float | None = None
+    seed: int = 0
+    devices: dict[int, dict[str, Any]] = field(init=False)
+    requests: int = field(default=0, init=False)
+    throttled: int = field(default=0, init=False)
+    errors: int = field(default=0, init=False)
+
+    def __post_init__(self) -> None:
+        """Create the wands of the account."""
+        self._random = random.Random(self.seed)
+        self._request_times: list[float] = []
+        self.devices = {
+            id_device: device_payload(id_device)
+            for id_device in range(1, self.wands + 1)
+        }
+
+    def client(self, session: Any, userid: int, apikey: str) -> MockPysunsa:
+        """Return a client with the interface of pysunsa.Pysunsa."""
+        return MockPysunsa(self)
+
+    def set_position(self, id_device: int, position: int) -> None:
+        """Move a wand as if it had been moved from the Sunsa app."""
+        self.devices[id_device]["position"] = position
+
+    def set_temperature(self, id_device: int, temperature: float) -> None:
+        """Change the temperature reported by a wand."""
+        self.devices[id_device]["temperature"]["value"] = temperature
+
+    async def async_request(self) -> None:
+        """Simulate the latency, errors and throttling of a request."""
+        self.requests += 1
+        await asyncio.sleep(self.latency + self._random.uniform(0, self.jitter))
+
+        if self.max_requests_per_second is not None:
+            now = monotonic()
+            self._request_times = [
+                request_time for request_time in self._request_times
+                if now - request_time < 1
+            ]
+            if len(self._request_times) >= self.max_requests_per_second:
+                self.throttled += 1
+                raise PysunsaError(429)
+            self._request_times.append(now)
+
+        if self._random.random() < self.error_rate:
+            self.errors += 1
+            raise PysunsaError(500)
+
+    async def async_get_devices(self) -> list[dict[str, Any]]:
+        """Return the payload of every wand."""
+        await self.async_request()
+        return [self.payload(id_device) for id_device in self.devices]
+
+    def payload(self, id_device: int) -> dict[str, Any]:
+        """Return a copy of the payload of a wand."""
+        device = self.devices[id_device]
+        return {**device, "temperature": dict(device["temperature"])}
+
+    async def async_push(
+        self,
+        session: Any,
+        url: str,
+        id_devices: list[int] | None = None
+    ) -> int:
+        """Push the state of some or all the wands to a webhook as the cloud would.
+
+        The session is an aiohttp client session or test client. Returns the HTTP
+        status of the response.
+        """
+        devices = [
+            self.payload(id_device)
+            for id_device in (self.devices if id_devices is None else id_devices)
+        ]
+        async with session.post(url, json={"devices": devices}) as response:
+            return response.status
+
+    async def async_update_device(self, id_device: int, position: int) -> None:
+        """Move a wand to an absolute position."""
+        await self.async_request()
+        if id_device not in self.devices:
+            raise PysunsaError(404)
+        self.set_position(id_device, position)
+
+
+class MockPysunsa:
+    """Client with the interface of pysunsa.Pysunsa backed by a MockSunsaCloud."""
+
+    def __init__(self, cloud: MockSunsaCloud) -> None:
+        """Initialize the client."""
+        self.cloud = cloud
+
+    async def get_devices(self) -> list[dict[str, Any]]:
+        """Return the payload of every wand."""
+        return await self.cloud.async_get_devices()
+
+    async def update_device(self, idDevice: int, position: int) -> None:
+        """Move a wand to an absolute position."""
+        await self.cloud.async_update_device(idDevice, position)
+
+
+def device_payload(id_device: int) -> dict[str, Any]:
+    """Return the API payload of a wand."""
+    vertical = id_device % 3 == 0
+    return {
+        "idDevice": id_device,
+        "name": f"Wand {id_device}",
+        "isConnected": True,
+        "position": 0,
+        "batteryPercentage": 100 - id_device % 50,
+        "temperature": {"value": 70.0, "unit": "F"},
+        "blindType": {"text": "Vertical" if vertical else "Horizontal"},
+        "defaultSmartHomeDirection": {"text": "Right" if vertical else "Down"},
+    }
+
+
+def create_app(
+    cloud: MockSunsaCloud,
+    push_url: str | None = None
+) -> web.Application:
+    """Serve a MockSunsaCloud over HTTP with the routes of the public Sunsa API.
+
+    If a push URL is given, the state of every moved wand is pushed to it.
+    """
+
+    async def get_devices(request: web.Request) -> web.Response:
+        try:
+            devices = await cloud.async_get_devices()
+        except PysunsaError as error:
+            return web.json_response({}, status=error.args[0])
+        return web.json_response({"devices": devices})
+
+    async def update_device(request: web.Request) -> web.Response:
+        body = await request.json()
+        try:
+            await cloud.async_update_device(
+                int(request.match_info["id_device"]),
+                int(body["Position"])
+            )
+        except PysunsaError as error:
+            return web.json_response({}, status=error.args[0])
+        if push_url is not None:
+            await cloud.async_push(
+                request.app["push_session"],
+                push_url,
+                [int(request.match_info["id_device"])]
+            )
+        return web.json_response({})
+
+    async def push_session(app: web.Application):
+        async with ClientSession() as session:
+            app["push_session"] = session
+            yield
+
+    app = web.Application()
+    if push_url is not None:
+        app.cleanup_ctx.append(push_session)
+    app.router.add_get("/api/public/{user_id}/devices", get_devices)
+    app.router.add_put("/api/public/{user_id}/devices/{id_device}", update_device)
+    return app
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--wands", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-requests-per-second", type=float, default=None)
+    parser.add_argument("--port", type=int, default=8124)
+    parser.add_argument(
+        "--push-url",
+        default=None,
+        help="webhook URL of the Sunsa config entry to push moved wands to",
+    )
+    args = parser.parse_args()
+    web.run_app(
+        create_app(MockSunsaCloud(
+            wands=args.wands,
+            latency=args.latency,
+            jitter=args.jitter,
+            error_rate=args.error_rate,
+            max_requests_per_second=args.max_requests_per_second,
+        ), args.push_url),
+        host="127.0.0.1",
+        port=args.port,
+    )
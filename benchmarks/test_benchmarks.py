@@ -0,0 +1,295 @@
+
+
+"""End-to-end performance benchmarks of the Sunsa integration.
+
+Run offline against the mock Sunsa cloud with:
+    pytest benchmarks
+"""
+
+
+from __future__ import annotations
+
+from statistics import mean
+from time import perf_counter
+import tracemalloc
+from unittest.mock import patch
+
+import pytest
+
+from homeassistant.const import CONF_API_KEY, CONF_EMAIL
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.helpers.entity import Entity
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.sunsa.const import (
+    DOMAIN,
+    USER_ID,
+    CONF_MAX_CONCURRENT_COMMANDS,
+    CONF_REQUEST_RATE,
+)
+from homeassistant.components.webhook import async_generate_path
+from homeassistant.const import CONF_WEBHOOK_ID
+
+from custom_components.sunsa.coordinator import SunsaDataUpdateCoordinator
+from custom_components.sunsa.governor import CircuitState
+from custom_components.sunsa.sensor import ACCOUNT_SENSORS
+
+from .conftest import record
+from .mock_sunsa import MockSunsaCloud
+
+POLL_ROUNDS = 5
+COMMANDED_WANDS = 20
+DEGRADED_POLL_ROUNDS = 20
+# Retry, rate limit and circuit delays of the governor, scaled down 100 times so
+# that the degraded cloud benchmark runs in seconds
+GOVERNOR_DELAYS = {
+    "REQUEST_RETRY_DELAY": 0.01,
+    "REQUEST_RETRY_MAX_DELAY": 0.3,
+    "RATE_LIMITED_DELAY": 0.1,
+    "CIRCUIT_OPEN_DELAY": 0.3,
+    "CIRCUIT_MAX_OPEN_DELAY": 3,
+}
+
+
+class StateWriteCounter:
+    """Count the state writes of every entity."""
+
+    def __init__(self) -> None:
+        """Initialize the counter."""
+        self.count = 0
+        self._write = Entity.async_write_ha_state
+
+    def __enter__(self) -> StateWriteCounter:
+        """Start counting."""
+        counter = self
+
+        def async_write_ha_state(entity: Entity) -> None:
+            counter.count += 1
+            counter._write(entity)
+
+        self._patch = patch.object(Entity, "async_write_ha_state", async_write_ha_state)
+        self._patch.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        """Stop counting."""
+        self._patch.stop()
+
+
+async def async_setup_sunsa(
+    hass: HomeAssistant,
+    cloud: MockSunsaCloud
+) -> tuple[MockConfigEntry, SunsaDataUpdateCoordinator]:
+    """Set up the integration with an account on the mock cloud."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title="bench@example.com",
+        unique_id="bench@example.com",
+        data={CONF_EMAIL: "bench@example.com", USER_ID: 1, CONF_API_KEY: "key"},
+        options={CONF_MAX_CONCURRENT_COMMANDS: 20, CONF_REQUEST_RATE: 20},
+    )
+    entry.add_to_hass(hass)
+    with patch("custom_components.sunsa.governor.Pysunsa", cloud.client):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+    return entry, hass.data[DOMAIN][entry.entry_id]
+
+
+async def async_unload_sunsa(hass: HomeAssistant, entry: MockConfigEntry) -> None:
+    """Unload the integration."""
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+async def async_timed_refresh(coordinator: SunsaDataUpdateCoordinator) -> float:
+    """Return the seconds taken by a coordinator refresh."""
+    start = perf_counter()
+    await coordinator.async_refresh()
+    return perf_counter() - start
+
+
+@pytest.mark.parametrize("expected_lingering_timers", [True])
+async def test_poll_cycle(hass: HomeAssistant, wands: int) -> None:
+    """Benchmark the poll cycle and the entity updates it causes."""
+    cloud = MockSunsaCloud(wands=wands)
+    tracemalloc.start()
+    entry, coordinator = await async_setup_sunsa(hass, cloud)
+
+    with StateWriteCounter() as writes:
+        unchanged = [await async_timed_refresh(coordinator) for _ in range(POLL_ROUNDS)]
+    record("poll cycle, no changes", wands, min(unchanged) * 1000, "ms")
+    record("state writes per poll, no changes", wands, writes.count / POLL_ROUNDS, "")
+    # When no device changed, only account counters that moved are written
+    assert writes.count < POLL_ROUNDS
+
+    changed = []
+    with StateWriteCounter() as writes:
+        for poll in range(POLL_ROUNDS):
+            for id_device in cloud.devices:
+                cloud.set_temperature(id_device, 60 + poll)
+            changed.append(await async_timed_refresh(coordinator))
+    record("poll cycle, all wands changed", wands, min(changed) * 1000, "ms")
+    record("state writes per poll, all changed", wands, writes.count / POLL_ROUNDS, "")
+
+    coordinator.changed_device_ids = set(coordinator.data)
+    start = perf_counter()
+    coordinator.async_update_listeners()
+    record("entity update fan-out", wands, (perf_counter() - start) * 1000, "ms")
+
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    record("peak memory", wands, peak / 2**20, "MiB")
+
+    await async_unload_sunsa(hass, entry)
+
+
+@pytest.mark.parametrize("expected_lingering_timers", [True])
+async def test_command_round_trip(hass: HomeAssistant, wands: int) -> None:
+    """Benchmark the latency of cover commands until they reach the cloud."""
+    cloud = MockSunsaCloud(wands=wands, latency=0.05, jitter=0.05)
+    entry, _ = await async_setup_sunsa(hass, cloud)
+    entity_ids = sorted(hass.states.async_entity_ids("cover"))
+
+    start = perf_counter()
+    await hass.services.async_call(
+        "cover", "close_cover", {"entity_id": entity_ids[0]}, blocking=True
+    )
+    record("command round trip, 1 wand", wands, (perf_counter() - start) * 1000, "ms")
+
+    commanded = entity_ids[:COMMANDED_WANDS]
+    start = perf_counter()
+    await hass.services.async_call(
+        "cover", "close_cover", {"entity_id": commanded}, blocking=True
+    )
+    record(
+        f"command round trip, {len(commanded)} wands",
+        wands,
+        (perf_counter() - start) * 1000,
+        "ms"
+    )
+    assert sum(
+        abs(device["position"]) == 100 for device in cloud.devices.values()
+    ) == len(commanded)
+
+    await async_unload_sunsa(hass, entry)
+
+
+@pytest.mark.parametrize("expected_lingering_timers", [True])
+async def test_push_ingestion(
+    hass: HomeAssistant,
+    hass_client_no_auth,
+    wands: int
+) -> None:
+    """Benchmark the merge of device states pushed to the webhook."""
+    cloud = MockSunsaCloud(wands=wands)
+    entry, coordinator = await async_setup_sunsa(hass, cloud)
+    client = await hass_client_no_auth()
+    url = async_generate_path(entry.data[CONF_WEBHOOK_ID])
+    requests = cloud.requests
+
+    cloud.set_position(1, 50)
+    with StateWriteCounter() as writes:
+        start = perf_counter()
+        assert await cloud.async_push(client, url, [1]) == 200
+        await hass.async_block_till_done()
+        record("push of 1 wand", wands, (perf_counter() - start) * 1000, "ms")
+    # Only the entities of the pushed wand and of the account are updated
+    device = dr.async_get(hass).async_get_device(identifiers={(DOMAIN, "Wand 1")})
+    wand_entities = er.async_entries_for_device(er.async_get(hass), device.id)
+    assert writes.count <= len(wand_entities) + len(ACCOUNT_SENSORS)
+    assert coordinator.data[1].position == 50
+    assert coordinator.update_interval == coordinator.push_consistency_interval
+
+    for id_device in cloud.devices:
+        cloud.set_position(id_device, 25)
+    with StateWriteCounter() as writes:
+        start = perf_counter()
+        assert await cloud.async_push(client, url) == 200
+        await hass.async_block_till_done()
+        record(
+            f"push of {wands} wands",
+            wands,
+            (perf_counter() - start) * 1000,
+            "ms"
+        )
+    assert cloud.requests == requests
+
+    await async_unload_sunsa(hass, entry)
+
+
+@pytest.mark.parametrize("expected_lingering_timers", [True])
+async def test_degraded_cloud(
+    hass: HomeAssistant,
+    monkeypatch: pytest.MonkeyPatch,
+    wands: int
+) -> None:
+    """Benchmark polls and commands while the cloud fails and throttles requests."""
+    for name, delay in GOVERNOR_DELAYS.items():
+        monkeypatch.setattr(f"custom_components.sunsa.governor.{name}", delay)
+    cloud = MockSunsaCloud(wands=wands, latency=0.005, jitter=0.005)
+    entry, coordinator = await async_setup_sunsa(hass, cloud)
+    governor = coordinator.governor
+    circuit_opened = 0
+
+    def count_opens(state: CircuitState) -> None:
+        """Count the times the circuit opened."""
+        nonlocal circuit_opened
+        circuit_opened += state is CircuitState.OPEN
+
+    unsub = governor.circuit_breaker.async_add_listener(count_opens)
+    # 5xx errors on a fifth of the requests, 429 errors above half the request rate
+    cloud.error_rate = 0.2
+    cloud.max_requests_per_second = 10
+
+    succeeded = []
+    for _ in range(DEGRADED_POLL_ROUNDS):
+        elapsed = await async_timed_refresh(coordinator)
+        if coordinator.last_update_success:
+            succeeded.append(elapsed)
+    record(
+        "degraded poll success rate",
+        wands,
+        len(succeeded) / DEGRADED_POLL_ROUNDS * 100,
+        "%"
+    )
+    if succeeded:
+        record("degraded poll cycle, mean", wands, mean(succeeded) * 1000, "ms")
+
+    commanded = list(cloud.devices)[:COMMANDED_WANDS]
+    start = perf_counter()
+    results = await coordinator.dispatcher.async_move_many(
+        {id_device: 100 for id_device in commanded}
+    )
+    record(
+        f"degraded commands, {len(commanded)} wands",
+        wands,
+        (perf_counter() - start) * 1000,
+        "ms"
+    )
+    delivered = [result for result in results.values() if result.success]
+    record(
+        "degraded command success rate",
+        wands,
+        len(delivered) / len(commanded) * 100,
+        "%"
+    )
+    record("throttled responses", wands, cloud.throttled, "")
+    record("server errors", wands, cloud.errors, "")
+    record("retried requests", wands, governor.requests_delayed, "")
+    record("dropped requests", wands, governor.requests_dropped, "")
+    record("circuit opened", wands, circuit_opened, "times")
+
+    # Failures were retried, and only delivered commands moved wands
+    assert cloud.throttled + cloud.errors > 0
+    assert governor.requests_delayed > 0
+    for result in results.values():
+        assert (cloud.devices[result.sunsa_device_id]["position"] == 100) is (
+            result.success
+        )
+
+    unsub()
+    cloud.error_rate = 0
+    cloud.max_requests_per_second = None
+    await async_unload_sunsa(hass, entry)
@@ -4,11 +4,23 @@
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers import config_validation as cv, device_registry as dr
-
-from .const import DOMAIN
-from .coordinator import SunsaDataUpdateCoordinator
+from homeassistant.helpers.typing import ConfigType
+
+from .const import DOMAIN, LOGGER, USER_ID
+from .coordinator import (
+    SunsaDataUpdateCoordinator,
+    async_get_account_coordinator,
+    snapshot_store,
+)
+from .governor import async_release_governor
+from .history import history_store
+from .journal import journal_store
+from .planner import planner_store
+from .presets import presets_store
+from .push import async_register_webhook
+from .services import async_setup_services
 
 
 PLATFORMS = [
@@ -20,28 +32,119 @@ PLATFORMS = [
 CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
 
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the Sunsa services."""
+    async_setup_services(hass)
+    return True
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up the Sunsa coordinator from a config entry."""
 
-    coordinator = SunsaDataUpdateCoordinator(hass, entry)
-    await coordinator.async_config_entry_first_refresh()
+    if coordinator := async_get_account_coordinator(hass, entry.data[USER_ID]):
+        # Entries of the same Sunsa account share the polling and the entities of
+        # the entry set up first
+        LOGGER.debug(
+            "Sharing the Sunsa account of %s with %s",
+            coordinator.config_entry.title,
+            entry.title
+        )
+        hass.data[DOMAIN][entry.entry_id] = coordinator
+        return True
 
+    coordinator = SunsaDataUpdateCoordinator(hass, entry)
+    # Registered before the first refresh so that the entries of the account set up
+    # meanwhile share it
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = coordinator
+    try:
+        if coordinator.journal is not None:
+            await coordinator.journal.async_load()
+        await coordinator.sun_tracker.async_load()
+        await coordinator.history.async_load()
+        await coordinator.presets.async_load()
+        # Start from the devices just fetched by the config flow, or else from the
+        # last known data refreshed in the background, so that setup doesn't
+        # depend on the Sunsa cloud latency
+        prefetched = coordinator.async_load_prefetched_devices()
+        snapshot_loaded = not prefetched and await coordinator.async_load_snapshot()
+        if not prefetched and not snapshot_loaded:
+            await coordinator.async_config_entry_first_refresh()
+    except Exception:
+        hass.data[DOMAIN].pop(entry.entry_id)
+        _async_release_account(hass, coordinator)
+        raise
+
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(coordinator.sun_tracker.async_start())
+    entry.async_on_unload(async_register_webhook(hass, entry, coordinator))
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+
+    if snapshot_loaded:
+        entry.async_create_background_task(
+            hass,
+            coordinator.async_refresh(),
+            f"{DOMAIN} {entry.title} refresh"
+        )
+    elif prefetched:
+        # Open the connection of the first command ahead of time
+        entry.async_create_background_task(
+            hass,
+            coordinator.governor.async_warm_up(),
+            f"{DOMAIN} {entry.title} warm up"
+        )
 
     return True
 
 
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload Sunsa config entry when its options change."""
+    coordinator: SunsaDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
+    # Data updates, e.g. by a reauth, reload the entry themselves if needed
+    if entry.options != coordinator.entry_options:
+        await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload Sunsa config entry."""
 
+    coordinator: SunsaDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
+    if coordinator.config_entry is not entry:
+        hass.data[DOMAIN].pop(entry.entry_id)
+        return True
+
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
         hass.data[DOMAIN].pop(entry.entry_id)
+        _async_release_account(hass, coordinator)
+        if not any(
+            shared.governor is coordinator.governor
+            for shared in hass.data[DOMAIN].values()
+        ):
+            await async_release_governor(hass, coordinator.governor.user_id)
 
     return unload_ok
 
 
+@callback
+def _async_release_account(
+    hass: HomeAssistant,
+    coordinator: SunsaDataUpdateCoordinator
+) -> None:
+    """Hand the account over to the entries that shared a coordinator."""
+    for entry_id, shared in list(hass.data[DOMAIN].items()):
+        if shared is coordinator:
+            hass.async_create_task(hass.config_entries.async_reload(entry_id))
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the data stored for a Sunsa config entry."""
+    await snapshot_store(hass, entry.entry_id).async_remove()
+    await journal_store(hass, entry.entry_id).async_remove()
+    await planner_store(hass, entry.entry_id).async_remove()
+    await history_store(hass, entry.entry_id).async_remove()
+    await presets_store(hass, entry.entry_id).async_remove()
+
+
 async def async_remove_config_entry_device(
     hass: HomeAssistant,
     config_entry: ConfigEntry,
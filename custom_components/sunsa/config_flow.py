@@ -8,20 +8,44 @@ from __future__ import annotations
 import asyncio
 from typing import Any
 
-from aiohttp.client_exceptions import ClientConnectorError
+from aiohttp import ClientError
 from pysunsa import Pysunsa
 from pysunsa.exceptions import PysunsaError
 import voluptuous as vol
 
 from homeassistant import config_entries
+from homeassistant.components import webhook
 from homeassistant.const import (
     CONF_EMAIL,
-    CONF_API_KEY
+    CONF_API_KEY,
+    CONF_WEBHOOK_ID
 )
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.network import NoURLAvailableError
 
-from .const import DOMAIN, LOGGER, USER_ID
+from .const import (
+    DOMAIN,
+    LOGGER,
+    USER_ID,
+    CONF_FAST_UPDATE_INTERVAL,
+    CONF_IDLE_UPDATE_INTERVAL,
+    CONF_MAX_CONCURRENT_COMMANDS,
+    CONF_REQUEST_RATE,
+    CONF_COMMAND_JOURNAL,
+    CONF_SUN_TRACKING_THRESHOLD,
+    DEFAULT_FAST_UPDATE_INTERVAL,
+    DEFAULT_IDLE_UPDATE_INTERVAL,
+    DEFAULT_MAX_CONCURRENT_COMMANDS,
+    DEFAULT_REQUEST_RATE,
+    DEFAULT_COMMAND_JOURNAL,
+    DEFAULT_SUN_TRACKING_THRESHOLD,
+    MIN_FAST_UPDATE_INTERVAL,
+    MAX_IDLE_UPDATE_INTERVAL,
+)
+from .coordinator import async_prefetch_devices
+from .governor import CircuitOpenError, async_get_active_governor
 
 
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -29,25 +53,41 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> OptionsFlow:
+        """Get the options flow for this handler."""
+        return OptionsFlow(config_entry)
+
     async def validate_user_input(
         self,
         user_input: dict[str, Any],
         errors: dict[str, str],
         description_placeholders: dict[str, str] | Any = None,
     ):
-        sunsa = Pysunsa(
-            async_get_clientsession(self.hass),
-            userid=user_input[USER_ID],
-            apikey=user_input[CONF_API_KEY]
-        )
+        if (governor := async_get_active_governor(
+            self.hass, user_input[USER_ID]
+        )) is not None:
+            # The account is in use, its API key is only replaced on reauth
+            request = governor.async_validate_api_key(user_input[CONF_API_KEY])
+        else:
+            # The governor and session of an account are left to its entry setup
+            request = Pysunsa(
+                async_get_clientsession(self.hass),
+                userid=user_input[USER_ID],
+                apikey=user_input[CONF_API_KEY]
+            ).get_devices()
 
         try:
             async with asyncio.timeout(15):
-                devices = await sunsa.get_devices()
+                devices = await request
         except (
-            ClientConnectorError,
+            ClientError,
             PysunsaError,
             TimeoutError,
+            CircuitOpenError,
         ) as error:
             LOGGER.debug(error.args, exc_info=True)
             if isinstance(error, PysunsaError) and error.args[0] == 401:
@@ -60,6 +100,8 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             errors["base"] = "unknown"
             description_placeholders["error_detail"] = str(error.args)
         else:
+            # Saves the entry setup from fetching the same devices again
+            async_prefetch_devices(self.hass, user_input[USER_ID], devices)
             return devices
 
     async def async_step_user(
@@ -138,6 +180,89 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 errors=errors,
             )
 
-        self.hass.config_entries.async_update_entry(self._reauth_entry, data=user_input)
+        if (governor := async_get_active_governor(
+            self.hass, user_input[USER_ID]
+        )) is not None:
+            governor.async_set_api_key(user_input[CONF_API_KEY])
+        # Keeps the rest of the entry data, like the webhook id
+        self.hass.config_entries.async_update_entry(
+            self._reauth_entry, data={**self._reauth_entry.data, **user_input}
+        )
         await self.hass.config_entries.async_reload(self._reauth_entry.entry_id)
-        return self.async_abort(reason="reauth_successful")
\ No newline at end of file
+        return self.async_abort(reason="reauth_successful")
+
+
+class OptionsFlow(config_entries.OptionsFlowWithConfigEntry):
+    """Handle Sunsa options."""
+
+    async def async_step_init(
+        self,
+        user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the polling and command options."""
+        errors: dict[str, str] = {}
+
+        if user_input is not None:
+            if (user_input[CONF_FAST_UPDATE_INTERVAL]
+                    > user_input[CONF_IDLE_UPDATE_INTERVAL]):
+                errors["base"] = "fast_slower_than_idle"
+            else:
+                return self.async_create_entry(data=user_input)
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CONF_FAST_UPDATE_INTERVAL,
+                        default=self.options.get(
+                            CONF_FAST_UPDATE_INTERVAL, DEFAULT_FAST_UPDATE_INTERVAL
+                        ),
+                    ): vol.All(int, vol.Range(min=MIN_FAST_UPDATE_INTERVAL)),
+                    vol.Required(
+                        CONF_IDLE_UPDATE_INTERVAL,
+                        default=self.options.get(
+                            CONF_IDLE_UPDATE_INTERVAL, DEFAULT_IDLE_UPDATE_INTERVAL
+                        ),
+                    ): vol.All(int, vol.Range(
+                        min=MIN_FAST_UPDATE_INTERVAL, max=MAX_IDLE_UPDATE_INTERVAL
+                    )),
+                    vol.Required(
+                        CONF_MAX_CONCURRENT_COMMANDS,
+                        default=self.options.get(
+                            CONF_MAX_CONCURRENT_COMMANDS, DEFAULT_MAX_CONCURRENT_COMMANDS
+                        ),
+                    ): vol.All(int, vol.Range(min=1, max=20)),
+                    vol.Required(
+                        CONF_REQUEST_RATE,
+                        default=self.options.get(
+                            CONF_REQUEST_RATE, DEFAULT_REQUEST_RATE
+                        ),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0.1, max=20)),
+                    vol.Required(
+                        CONF_COMMAND_JOURNAL,
+                        default=self.options.get(
+                            CONF_COMMAND_JOURNAL, DEFAULT_COMMAND_JOURNAL
+                        ),
+                    ): bool,
+                    vol.Required(
+                        CONF_SUN_TRACKING_THRESHOLD,
+                        default=self.options.get(
+                            CONF_SUN_TRACKING_THRESHOLD, DEFAULT_SUN_TRACKING_THRESHOLD
+                        ),
+                    ): vol.All(int, vol.Range(min=1, max=100)),
+                }
+            ),
+            description_placeholders={"webhook_url": self._webhook_url()},
+            errors=errors,
+        )
+
+    def _webhook_url(self) -> str:
+        """Return the URL device states can be pushed to."""
+        if (webhook_id := self.config_entry.data.get(CONF_WEBHOOK_ID)) is None:
+            # Registered when the entry is first set up
+            return "-"
+        try:
+            return webhook.async_generate_url(self.hass, webhook_id)
+        except NoURLAvailableError:
+            return webhook.async_generate_path(webhook_id)
@@ -19,10 +19,101 @@ TEXT: Final = "text"
 DEFAULT_SMART_HOME_DIRECTION: Final = "defaultSmartHomeDirection"
 USER_ID: Final = "user_id"
 SERVICE_SET_ABSOLUTE_POSITION: Final = "set_absolute_position"
+SERVICE_SET_ABSOLUTE_POSITIONS: Final = "set_absolute_positions"
+ATTR_TARGETS: Final = "targets"
 ATTR_POSITION: Final = "position"
 ATTR_CURRENT_ABSOLUTE_POSITION: Final = "current_absolute_position"
 BLIND_TYPE: Final = "blindType"
 IS_CONNECTED: Final = "isConnected"
+BATTERY_PERCENTAGE: Final = "batteryPercentage"
 
-UPDATE_INTERVAL = timedelta(seconds=20)
+CONF_FAST_UPDATE_INTERVAL: Final = "fast_update_interval"
+CONF_IDLE_UPDATE_INTERVAL: Final = "idle_update_interval"
+
+# Polling speeds up right after a command and backs off to the idle interval
+# once every wand has reached its target position.
+DEFAULT_FAST_UPDATE_INTERVAL = 3
+DEFAULT_IDLE_UPDATE_INTERVAL = 60
+MIN_FAST_UPDATE_INTERVAL = 2
+MAX_IDLE_UPDATE_INTERVAL = 900
+FAST_POLL_WINDOW = timedelta(seconds=60)
+UPDATE_INTERVAL_BACKOFF = 2
+# Covers assume the commanded position until it is reported or this timeout ends
+OPTIMISTIC_STATE_TIMEOUT = timedelta(seconds=90)
 UPDATE_TIMEOUT = 15
+
+STORAGE_VERSION = 1
+# Delay in seconds to batch the writes of the last known devices data to storage
+SNAPSHOT_SAVE_DELAY = 60
+# Age in seconds up to which the devices fetched by a config flow seed the setup
+PREFETCH_MAX_AGE = 60
+
+# While the cloud pushes device states, polling only checks the data at this interval
+# and resumes when no push was received for as long
+PUSH_CONSISTENCY_INTERVAL = timedelta(minutes=15)
+
+CONF_MAX_CONCURRENT_COMMANDS: Final = "max_concurrent_commands"
+CONF_REQUEST_RATE: Final = "request_rate"
+
+# Commands of an account are sent by a dispatcher with bounded concurrency
+DEFAULT_MAX_CONCURRENT_COMMANDS = 4
+# All the requests of an account are paced and retried by a shared governor
+DEFAULT_REQUEST_RATE = 2.0
+REQUEST_BURST = 4
+REQUEST_RETRIES = 2
+REQUEST_RETRY_DELAY = 1
+REQUEST_RETRY_MAX_DELAY = 30
+# Seconds to hold the requests after a rate limited response without Retry-After
+RATE_LIMITED_DELAY = 10
+# The circuit opens after consecutive failed requests, probes are spaced out from
+# the open delay up to the max open delay in seconds
+CIRCUIT_FAILURE_THRESHOLD = 3
+CIRCUIT_OPEN_DELAY = 30
+CIRCUIT_MAX_OPEN_DELAY = 300
+# Window in seconds in which commands to the same device are coalesced
+COMMAND_DEBOUNCE = 0.3
+
+CONF_COMMAND_JOURNAL: Final = "command_journal"
+# Commands that failed to reach the cloud are kept and replayed when opted in
+DEFAULT_COMMAND_JOURNAL = False
+JOURNAL_SAVE_DELAY = 5
+# Journaled commands still failing after this many replays are given up on
+JOURNAL_MAX_REPLAYS = 5
+
+CONF_SUN_TRACKING_THRESHOLD: Final = "sun_tracking_threshold"
+# Sun tracking only moves wands off from their planned position by more than this
+DEFAULT_SUN_TRACKING_THRESHOLD = 10
+SERVICE_SET_WINDOW_AZIMUTH: Final = "set_window_azimuth"
+ATTR_WINDOW_AZIMUTH: Final = "window_azimuth"
+
+# Number of latest samples kept by each telemetry histogram
+TELEMETRY_WINDOW = 500
+
+SUNSA_API_URL: Final = "https://app.sunsahomes.com"
+# Connection pool of the HTTP session of each account
+SESSION_CONNECTION_LIMIT = 8
+# Seconds idle connections are kept open, longer than the default idle interval
+SESSION_KEEPALIVE_TIMEOUT = 75
+SESSION_DNS_CACHE_TTL = 300
+
+# Per wand history, sampled at most once per interval in seconds
+HISTORY_SIZE = 336
+HISTORY_SAMPLE_INTERVAL = 3600
+HISTORY_SAVE_DELAY = 600
+# Shortest span in seconds of battery samples to forecast the drain from
+HISTORY_MIN_DRAIN_SPAN = 12 * 3600
+
+SERVICE_SAVE_PRESET: Final = "save_preset"
+SERVICE_APPLY_PRESET: Final = "apply_preset"
+SERVICE_DELETE_PRESET: Final = "delete_preset"
+ATTR_TOLERANCE: Final = "tolerance"
+# Wands within this many position steps of a preset are not commanded again
+DEFAULT_PRESET_TOLERANCE = 2
+
+SERVICE_PROFILE: Final = "profile"
+ATTR_DURATION: Final = "duration"
+ATTR_CYCLES: Final = "cycles"
+# Seconds a profile runs for unless it reaches the number of poll cycles first
+DEFAULT_PROFILE_DURATION = 60
+MAX_PROFILE_DURATION = 3600
+PROFILE_TOP_FUNCTIONS = 25
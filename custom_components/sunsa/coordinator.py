@@ -4,48 +4,536 @@
 """Provides the Sunsa DataUpdateCoordinator."""
 
 
-import asyncio
+from collections.abc import Callable, Iterable
+from datetime import timedelta
+import math
+from time import monotonic
 from typing import Any
 
-from pysunsa import Pysunsa
+from aiohttp import ClientError
 from pysunsa.exceptions import PysunsaError
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.exceptions import ConfigEntryAuthFailed
 from homeassistant.const import CONF_API_KEY
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 
-from .const import LOGGER, UPDATE_INTERVAL, UPDATE_TIMEOUT, DOMAIN, IDDEVICE, USER_ID
+from .const import (
+    LOGGER,
+    DOMAIN,
+    USER_ID,
+    CONF_FAST_UPDATE_INTERVAL,
+    CONF_IDLE_UPDATE_INTERVAL,
+    CONF_MAX_CONCURRENT_COMMANDS,
+    CONF_REQUEST_RATE,
+    CONF_COMMAND_JOURNAL,
+    CONF_SUN_TRACKING_THRESHOLD,
+    DEFAULT_FAST_UPDATE_INTERVAL,
+    DEFAULT_IDLE_UPDATE_INTERVAL,
+    DEFAULT_MAX_CONCURRENT_COMMANDS,
+    DEFAULT_REQUEST_RATE,
+    DEFAULT_COMMAND_JOURNAL,
+    DEFAULT_SUN_TRACKING_THRESHOLD,
+    FAST_POLL_WINDOW,
+    UPDATE_INTERVAL_BACKOFF,
+    STORAGE_VERSION,
+    SNAPSHOT_SAVE_DELAY,
+    PREFETCH_MAX_AGE,
+    PUSH_CONSISTENCY_INTERVAL,
+)
+from .dispatcher import SunsaCommandDispatcher
+from .governor import CircuitOpenError, CircuitState, async_get_governor
+from .history import SunsaHistory
+from .journal import SunsaCommandJournal
+from .models import SunsaDevice
+from .planner import SunsaSunTracker
+from .presets import SunsaPresets
+from .telemetry import SunsaTelemetry
 
 
-class SunsaDataUpdateCoordinator(DataUpdateCoordinator):
+DATA_PREFETCHED_DEVICES = f"{DOMAIN}_prefetched_devices"
+
+
+@callback
+def async_prefetch_devices(
+    hass: HomeAssistant,
+    user_id: int,
+    devices: list[dict[str, Any]]
+) -> None:
+    """Keep the devices fetched by a config flow for the setup of its entry."""
+    hass.data.setdefault(DATA_PREFETCHED_DEVICES, {})[user_id] = (
+        monotonic(),
+        devices
+    )
+
+
+def snapshot_store(hass: HomeAssistant, entry_id: str) -> Store[dict[str, Any]]:
+    """Return the store of the last known devices data of a config entry."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.devices")
+
+
+@callback
+def async_get_account_coordinator(
+    hass: HomeAssistant,
+    user_id: int
+) -> "SunsaDataUpdateCoordinator | None":
+    """Return the coordinator already polling a Sunsa account, if any."""
+    return next(
+        (
+            coordinator
+            for coordinator in _async_polling_coordinators(hass)
+            if coordinator.governor.user_id == user_id
+        ),
+        None
+    )
+
+
+def poll_slot_delay(now: float, index: int, count: int, interval: float) -> float:
+    """Return the seconds until the next poll slot of an account.
+
+    The slots of the accounts are spread evenly over the interval, the slot of the
+    account at the given index repeating every interval. The first slot at least
+    half an interval away is returned, so that polls are never closer than that.
+    """
+    offset = index * interval / count
+    earliest = now + interval / 2
+    return offset + math.ceil((earliest - offset) / interval) * interval - now
+
+
+@callback
+def _async_polling_coordinators(
+    hass: HomeAssistant
+) -> list["SunsaDataUpdateCoordinator"]:
+    """Return the coordinators of the config entries that own their coordinator."""
+    return [
+        coordinator
+        for entry_id, coordinator in hass.data.get(DOMAIN, {}).items()
+        if coordinator.config_entry.entry_id == entry_id
+    ]
+
+
+class SunsaDataUpdateCoordinator(DataUpdateCoordinator[dict[int, SunsaDevice]]):
     """Coordinator is responsible for updating devices."""
 
     def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
         """Initialize."""
+        # Options the coordinator was set up with, changing them reloads the entry
+        self.entry_options = dict(entry.options)
+        self.fast_update_interval = timedelta(seconds=entry.options.get(
+            CONF_FAST_UPDATE_INTERVAL, DEFAULT_FAST_UPDATE_INTERVAL
+        ))
+        self.idle_update_interval = timedelta(seconds=entry.options.get(
+            CONF_IDLE_UPDATE_INTERVAL, DEFAULT_IDLE_UPDATE_INTERVAL
+        ))
         super().__init__(
             hass,
             LOGGER,
             name=DOMAIN,
-            update_interval=UPDATE_INTERVAL,
+            update_interval=self.idle_update_interval,
         )
-        self.sunsa = Pysunsa(
-            async_get_clientsession(hass),
+        # Polls, commands and config flows of the account share the governor
+        self.governor = async_get_governor(
+            hass,
             entry.data[USER_ID],
             entry.data[CONF_API_KEY]
         )
+        if self.governor.api_key != entry.data[CONF_API_KEY]:
+            self.governor.async_set_api_key(entry.data[CONF_API_KEY])
+        self.governor.async_set_rate(
+            entry.options.get(CONF_REQUEST_RATE, DEFAULT_REQUEST_RATE)
+        )
+        entry.async_on_unload(
+            self.governor.circuit_breaker.async_add_listener(self._async_circuit_changed)
+        )
+        self._refreshing = False
+        self.telemetry = SunsaTelemetry()
+        self.journal = (
+            SunsaCommandJournal(hass, entry.entry_id)
+            if entry.options.get(CONF_COMMAND_JOURNAL, DEFAULT_COMMAND_JOURNAL)
+            else None
+        )
+        self.dispatcher = SunsaCommandDispatcher(
+            hass,
+            self.governor,
+            self.telemetry,
+            max_concurrency=entry.options.get(
+                CONF_MAX_CONCURRENT_COMMANDS, DEFAULT_MAX_CONCURRENT_COMMANDS
+            ),
+            on_command_sent=self.async_track_command,
+            journal=self.journal,
+        )
+        self.history = SunsaHistory(hass, entry.entry_id)
+        self.presets = SunsaPresets(hass, entry.entry_id)
+        self.sun_tracker = SunsaSunTracker(
+            hass,
+            self,
+            threshold=entry.options.get(
+                CONF_SUN_TRACKING_THRESHOLD, DEFAULT_SUN_TRACKING_THRESHOLD
+            ),
+        )
+        # Target positions of recently commanded devices, keyed by idDevice
+        self._pending_targets: dict[int, int] = {}
+        self._fast_poll_deadline = 0.0
+        # Polling slows down to a consistency check while the cloud pushes states
+        self.push_consistency_interval = max(
+            PUSH_CONSISTENCY_INTERVAL, self.idle_update_interval
+        )
+        self._last_push: float | None = None
+        self.pushes_received = 0
+        # Devices whose data changed in the last poll, only their entities are notified
+        self.changed_device_ids: set[int] = set()
+        self._last_notified_success = True
+        self._snapshot_store = snapshot_store(hass, entry.entry_id)
+        # Devices that appeared or disappeared from the account in the last poll
+        self._added_device_ids: set[int] = set()
+        self._removed_device_names: set[str] = set()
+        self._device_listeners: list[Callable[[Iterable[int]], None]] = []
+        self._poll_listeners: list[CALLBACK_TYPE] = []
+
+    @callback
+    def async_add_device_listener(
+        self,
+        device_callback: Callable[[Iterable[int]], None]
+    ) -> CALLBACK_TYPE:
+        """Listen for devices added to the account after setup."""
+        self._device_listeners.append(device_callback)
+
+        @callback
+        def remove_listener() -> None:
+            """Remove the device listener."""
+            self._device_listeners.remove(device_callback)
+
+        return remove_listener
+
+    @callback
+    def async_add_poll_listener(self, poll_callback: CALLBACK_TYPE) -> CALLBACK_TYPE:
+        """Listen for the end of each poll, whether it succeeded or not."""
+        self._poll_listeners.append(poll_callback)
+
+        @callback
+        def remove_listener() -> None:
+            """Remove the poll listener."""
+            self._poll_listeners.remove(poll_callback)
+
+        return remove_listener
+
+    @callback
+    def _async_process_device_changes(self) -> None:
+        """Add entities for new devices and retire the removed ones."""
+        if self._added_device_ids:
+            LOGGER.debug("New devices: %s", self._added_device_ids)
+            for device_callback in self._device_listeners:
+                device_callback(self._added_device_ids)
+            self._added_device_ids = set()
+
+        if self._removed_device_names:
+            LOGGER.debug("Removed devices: %s", self._removed_device_names)
+            device_registry = dr.async_get(self.hass)
+            for device_name in self._removed_device_names:
+                if device := device_registry.async_get_device(
+                    identifiers={(DOMAIN, device_name)}
+                ):
+                    device_registry.async_update_device(
+                        device.id,
+                        remove_config_entry_id=self.config_entry.entry_id
+                    )
+            self._removed_device_names = set()
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update the listeners of the devices whose data changed.
+
+        Listeners registered without a device context are always updated. All the
+        listeners are updated when the availability of the data changes.
+        """
+        if self.last_update_success != self._last_notified_success:
+            self._last_notified_success = self.last_update_success
+            changed_device_ids = None
+        elif self.last_update_success:
+            changed_device_ids = self.changed_device_ids
+        else:
+            changed_device_ids = set()
+
+        start = monotonic()
+        self._async_process_device_changes()
+        for update_callback, context in list(self._listeners.values()):
+            if (changed_device_ids is None
+                    or context is None
+                    or context in changed_device_ids):
+                update_callback()
+        self.telemetry.fan_out_time.add(monotonic() - start)
 
-    async def _async_update_data(self) -> dict[str, Any]:
+    async def async_load_snapshot(self) -> bool:
+        """Seed the data with the devices persisted by the last successful poll."""
+        if (snapshot := await self._snapshot_store.async_load()) is None:
+            return False
+
+        try:
+            data = self._parse_devices(snapshot["devices"])
+        except UpdateFailed as error:
+            LOGGER.debug("Ignoring the last known data: %s", error)
+            return False
+        self._update_changed_devices(data)
+        self.data = data
+        LOGGER.debug("Loaded last known data of %s devices", len(data))
+        return True
+
+    @callback
+    def async_load_prefetched_devices(self) -> bool:
+        """Seed the data with the devices fetched by a config flow moments ago."""
+        prefetched = self.hass.data.get(DATA_PREFETCHED_DEVICES, {}).pop(
+            self.governor.user_id, None
+        )
+        if prefetched is None:
+            return False
+
+        fetched_at, devices = prefetched
+        if monotonic() - fetched_at > PREFETCH_MAX_AGE:
+            return False
+        try:
+            data = self._parse_devices(devices)
+        except UpdateFailed as error:
+            LOGGER.debug("Ignoring the devices fetched by the config flow: %s", error)
+            return False
+        self._update_changed_devices(data)
+        self.data = data
+        self._snapshot_store.async_delay_save(
+            lambda: {"devices": devices},
+            SNAPSHOT_SAVE_DELAY
+        )
+        LOGGER.debug("Loaded %s devices fetched by the config flow", len(data))
+        return True
+
+    @callback
+    def _async_circuit_changed(self, state: CircuitState) -> None:
+        """Refresh once when the circuit closes after an outage."""
+        if state is CircuitState.CLOSED and not self._refreshing:
+            self.hass.async_create_task(self.async_request_refresh())
+
+    @callback
+    def async_track_command(self, sunsa_device_id: int, position: int) -> None:
+        """Poll quickly until the device reports the commanded position."""
+        self._pending_targets[sunsa_device_id] = position
+        self._fast_poll_deadline = monotonic() + FAST_POLL_WINDOW.total_seconds()
+        if self.push_active:
+            # The device state is pushed once it reaches the position
+            return
+        if self.update_interval != self.fast_update_interval:
+            self.update_interval = self.fast_update_interval
+            if self._listeners:
+                self._schedule_refresh()
+
+    @property
+    def pending_targets(self) -> dict[int, int]:
+        """Return the positions commanded to devices that did not report them yet.
+
+        Targets not reached in time are dropped, even before the next update.
+        """
+        if monotonic() >= self._fast_poll_deadline:
+            return {}
+        return dict(self._pending_targets)
+
+    @property
+    def push_active(self) -> bool:
+        """Return whether the cloud pushed device states recently."""
+        return self._last_push is not None and (
+            monotonic() - self._last_push
+            < self.push_consistency_interval.total_seconds()
+        )
+
+    @callback
+    def async_handle_push(self, payloads: list[dict[str, Any]]) -> None:
+        """Merge device states pushed by the cloud into the data.
+
+        Pushes are in the shape of the polled devices and may carry any subset of
+        the account. Unknown devices are left to a full poll.
+        """
+        if self.data is None:
+            return
+        devices = self._parse_devices(payloads)
+        self._last_push = monotonic()
+        self.pushes_received += 1
+        if unknown_ids := devices.keys() - self.data.keys():
+            LOGGER.debug("Pushed unknown devices %s, refreshing", unknown_ids)
+            self.hass.async_create_task(self.async_request_refresh())
+
+        previous = self.data
+        data = self._merge_devices({
+            sunsa_device_id: device
+            for sunsa_device_id, device in devices.items()
+            if sunsa_device_id in previous
+        })
+        self.history.async_record(previous, data, self.changed_device_ids)
+        update_interval = self._next_update_interval(data)
+        self.data = data
+        if self.changed_device_ids:
+            self.async_update_listeners()
+        # Pushes don't postpone the consistency check already scheduled
+        if update_interval != self.update_interval:
+            self.update_interval = update_interval
+            if self._listeners:
+                self._schedule_refresh()
+
+    @callback
+    def _schedule_refresh(self) -> None:
+        """Schedule a refresh, in the poll slot of the account when idle.
+
+        Idle polls of the accounts are spread evenly over the idle interval so that
+        they don't all hit the cloud and wake the event loop on the same tick.
+        """
+        coordinators = _async_polling_coordinators(self.hass)
+        if (self.update_interval != self.idle_update_interval
+                or self not in coordinators):
+            super()._schedule_refresh()
+            return
+
+        # The base scheduler waits for the update interval, to within a second. It
+        # is given the wait until the slot instead.
+        update_interval = self.update_interval
+        self.update_interval = timedelta(seconds=poll_slot_delay(
+            self.hass.loop.time(),
+            coordinators.index(self),
+            len(coordinators),
+            update_interval.total_seconds()
+        ))
+        try:
+            super()._schedule_refresh()
+        finally:
+            self.update_interval = update_interval
+
+    def _next_update_interval(self, data: dict[int, SunsaDevice]) -> timedelta:
+        """Return the polling interval to use after the given update."""
+        self._pending_targets = {
+            sunsa_device_id: position
+            for sunsa_device_id, position in self._pending_targets.items()
+            if sunsa_device_id in data
+            and data[sunsa_device_id].position != position
+        }
+        if self._pending_targets and monotonic() >= self._fast_poll_deadline:
+            LOGGER.debug(
+                "Devices %s did not reach their target position in time",
+                list(self._pending_targets)
+            )
+            self._pending_targets.clear()
+
+        if self.push_active:
+            # Pushes report the devices, polls only check that none was missed
+            return self.push_consistency_interval
+        if self._pending_targets:
+            return self.fast_update_interval
+
+        # Back off step by step until the idle interval is reached
+        return min(
+            self.update_interval * UPDATE_INTERVAL_BACKOFF,
+            self.idle_update_interval
+        )
+
+    async def _async_update_data(self) -> dict[int, SunsaDevice]:
         """Fetch devices data from Sunsa."""
+        self._refreshing = True
+        session_stats = self.governor.session.stats
+        responses_read = session_stats.responses_read
+        start = monotonic()
         try:
-            async with asyncio.timeout(UPDATE_TIMEOUT):
-                devices = await self.sunsa.get_devices()
+            devices = await self.governor.async_get_devices()
         except PysunsaError as error:
+            self.telemetry.poll_errors += 1
             if error.status_code == 401:
                 raise ConfigEntryAuthFailed() from error
             raise UpdateFailed(error) from error
+        except (ClientError, CircuitOpenError) as error:
+            self.telemetry.poll_errors += 1
+            raise UpdateFailed(error) from error
+        except TimeoutError:
+            self.telemetry.poll_timeouts += 1
+            raise
+        finally:
+            self._refreshing = False
+            self.telemetry.polls += 1
+            # Listeners run before the parsing, awaiting them resumes after it
+            for poll_callback in list(self._poll_listeners):
+                poll_callback()
+            circuit_breaker = self.governor.circuit_breaker
+            if circuit_breaker.state is CircuitState.OPEN:
+                # Only poll again when the circuit lets a probe request through
+                self.update_interval = max(
+                    timedelta(seconds=circuit_breaker.retry_in),
+                    self.fast_update_interval
+                )
+
+        self.telemetry.poll_latency.add(monotonic() - start)
+        if session_stats.responses_read > responses_read:
+            # Measured by the session as it read the response
+            self.telemetry.payload_size.add(session_stats.last_response_size)
+
+        start = monotonic()
+        # The API only returns the whole account. Every device is kept up to date
+        # and only the entities of the changed ones are notified.
+        data = self._parse_devices(devices)
+        self._update_changed_devices(data)
+        self.telemetry.parse_time.add(monotonic() - start)
+        self.history.async_record(self.data, data, self.changed_device_ids)
+        if self.changed_device_ids:
+            self._snapshot_store.async_delay_save(
+                lambda: {"devices": devices},
+                SNAPSHOT_SAVE_DELAY
+            )
+        self.update_interval = self._next_update_interval(data)
+        if self.journal is not None and self.journal.positions:
+            # The cloud is reachable again, deliver the commands it missed
+            self.config_entry.async_create_background_task(
+                self.hass,
+                self._async_replay_journal(data),
+                f"{DOMAIN} {self.config_entry.title} journal replay"
+            )
+        return data
+
+    async def _async_replay_journal(self, data: dict[int, SunsaDevice]) -> None:
+        """Send the journaled commands of the devices not at their target yet."""
+        if pending := self.journal.async_pop_pending(data):
+            LOGGER.info("Replaying %s journaled commands", len(pending))
+            # Paced by the governor, failed commands are journaled again
+            await self.dispatcher.async_move_many(pending)
+
+    @staticmethod
+    def _parse_devices(payloads: list[dict[str, Any]]) -> dict[int, SunsaDevice]:
+        """Parse the device payloads returned by the Sunsa API."""
+        try:
+            devices = [SunsaDevice.from_payload(payload) for payload in payloads]
+        except (KeyError, TypeError, ValueError, AttributeError) as error:
+            raise UpdateFailed(f"Unexpected device data: {error!r}") from error
+        return {device.id: device for device in devices}
+
+    def _merge_devices(
+        self,
+        devices: dict[int, SunsaDevice]
+    ) -> dict[int, SunsaDevice]:
+        """Merge refreshed devices into the data, diffing only those devices."""
+        self.changed_device_ids = {
+            sunsa_device_id
+            for sunsa_device_id, device in devices.items()
+            if self.data[sunsa_device_id] != device
+        }
+        if self.changed_device_ids:
+            LOGGER.debug("Devices with changed data: %s", self.changed_device_ids)
+        return self.data | devices
 
-        # Updated info for all devices
-        return {dev[IDDEVICE]: dev for dev in devices}
+    def _update_changed_devices(self, data: dict[int, SunsaDevice]) -> None:
+        """Diff the devices against the previous data."""
+        previous = self.data or {}
+        self.changed_device_ids = {
+            sunsa_device_id
+            for sunsa_device_id, device in data.items()
+            if previous.get(sunsa_device_id) != device
+        } | (previous.keys() - data.keys())
+        if self.data is not None:
+            self._added_device_ids = data.keys() - previous.keys()
+            self._removed_device_names = {
+                previous[sunsa_device_id].name
+                for sunsa_device_id in previous.keys() - data.keys()
+            }
+        if self.changed_device_ids:
+            LOGGER.debug("Devices with changed data: %s", self.changed_device_ids)
@@ -6,6 +6,8 @@
 from __future__ import annotations
 
 import voluptuous as vol
+from collections.abc import Iterable
+from datetime import datetime
 from typing import Any
 from homeassistant.components.cover import (
     ATTR_POSITION,
@@ -16,24 +18,23 @@ from homeassistant.components.cover import (
 
 from homeassistant.const import CONF_NAME
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers import entity_platform
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_call_later
 
 from .const import (
     DOMAIN,
-    DEFAULT_SMART_HOME_DIRECTION,
     SERVICE_SET_ABSOLUTE_POSITION,
     ATTR_CURRENT_ABSOLUTE_POSITION,
-    BLIND_TYPE,
-    LOGGER
+    LOGGER,
+    OPTIMISTIC_STATE_TIMEOUT,
 )
 from .coordinator import SunsaDataUpdateCoordinator
 from .entity import SunsaEntity
 
-from pysunsa import CLOSED_POSITION, OPEN_POSITION, RIGHT, DOWN
-from pysunsa.exceptions import PysunsaError
+from pysunsa import CLOSED_POSITION, OPEN_POSITION
 
 SERVICE_SET_POSITION_SCHEMA = {
     vol.Required(ATTR_POSITION): vol.All(
@@ -52,9 +53,17 @@ async def async_setup_entry(
 
     coordinator: SunsaDataUpdateCoordinator = hass.data[DOMAIN][config_entry.entry_id]
 
-    async_add_entities(
-        SunsaCover(coordinator, sunsa_device_id)
-        for sunsa_device_id in coordinator.data
+    @callback
+    def _async_add_covers(sunsa_device_ids: Iterable[int]) -> None:
+        """Add the covers of the given devices."""
+        async_add_entities(
+            SunsaCover(coordinator, sunsa_device_id)
+            for sunsa_device_id in sunsa_device_ids
+        )
+
+    _async_add_covers(coordinator.data)
+    config_entry.async_on_unload(
+        coordinator.async_add_device_listener(_async_add_covers)
     )
 
     platform = entity_platform.async_get_current_platform()
@@ -84,19 +93,23 @@ class SunsaCover(SunsaEntity, CoverEntity):
         sunsa_device_id: int,
     ) -> None:
         """Initialize the cover entity."""
-        device_name = coordinator.data[sunsa_device_id][CONF_NAME]
+        device_name = coordinator.data[sunsa_device_id].name
         super().__init__(
             coordinator,
             device_name,
             sunsa_device_id
         )
-        self.sunsa = self.coordinator.sunsa
+        # Commanded position assumed until the device reports it or the timeout ends
+        self._target_position: int | None = None
+        self._unsub_target_timeout: CALLBACK_TYPE | None = None
         LOGGER.debug("Instantiated cover: %s", device_name)
 
     @property
     def current_cover_position(self) -> int:
         """Return current position of cover."""
-        return CLOSED_POSITION - abs(self.current_absolute_position)
+        if self._target_position is None:
+            return self.device.cover_position
+        return CLOSED_POSITION - abs(self._target_position)
 
     @property
     def current_absolute_position(self) -> int:
@@ -105,7 +118,36 @@ class SunsaCover(SunsaEntity, CoverEntity):
         Blind position range is [-100, 100] where -100 is closed left or up,
         100 is closed right or down and 0 is fully open.
         """
-        return self.device.get(ATTR_POSITION)
+        if self._target_position is not None:
+            return self._target_position
+        return self.reported_absolute_position
+
+    @property
+    def reported_absolute_position(self) -> int | None:
+        """Return the absolute position last reported by the device, if any."""
+        if self.device is None:
+            return None
+        return self.device.position
+
+    @property
+    def assumed_state(self) -> bool:
+        """Return true while the commanded position is not confirmed yet."""
+        return self._target_position is not None
+
+    @property
+    def is_opening(self) -> bool:
+        """Return true if the cover is moving towards a more open position."""
+        if self._target_position is None or self.reported_absolute_position is None:
+            return False
+        return abs(self._target_position) < abs(self.reported_absolute_position)
+
+    @property
+    def is_closing(self) -> bool:
+        """Return true if the cover is moving towards a more closed position."""
+        if self._target_position is None or self.reported_absolute_position is None:
+            return False
+        return (not self.is_opening
+                and self._target_position != self.reported_absolute_position)
 
     @property
     def is_closed(self) -> bool:
@@ -127,21 +169,16 @@ class SunsaCover(SunsaEntity, CoverEntity):
         1 for right or down if a vertical or horizontal blind, respectively.
         -1 for left or up if a vertical or horizontal blind, respectively.
         """
-        if self.device[DEFAULT_SMART_HOME_DIRECTION]["text"] in (RIGHT, DOWN):
-            return 1
-        else:
-            return -1
+        return self.device.closing_direction
 
     @property
     def icon(self) -> str | None:
         """Icon of the entity, based on blind type."""
         if self.device is not None:
-            if self.device[BLIND_TYPE]["text"].lower() == "vertical":
-                orientation = "vertical"
-            else:
-                orientation = "horizontal"
+            if self._target_position is None:
+                return self.device.icon
 
-            icon_name = f"mdi:blinds-{orientation}"
+            icon_name = f"mdi:blinds-{self.device.orientation}"
             if self.is_closed:
                 icon_name += "-closed"
             return icon_name
@@ -168,9 +205,71 @@ class SunsaCover(SunsaEntity, CoverEntity):
             self.device_info[CONF_NAME],
             position
         )
-        try:
-            await self.coordinator.sunsa.update_device(self._sunsa_device_id, position)
-        except PysunsaError:
+        if position != self.reported_absolute_position:
+            self._async_set_target_position(position)
+        elif self._target_position is not None:
+            # Back to the reported position, no device change would confirm it
+            self._async_set_target_position(None)
+        result = await self.coordinator.dispatcher.async_move(
+            self._sunsa_device_id,
+            position
+        )
+        if not result.success:
+            self._async_set_target_position(None)
+            if result.queued:
+                LOGGER.warning(
+                    "Cover %s will be moved to position %s when the Sunsa cloud is "
+                    "reachable: %s",
+                    self.device_info[CONF_NAME],
+                    position,
+                    result.error
+                )
+                return
             raise HomeAssistantError(
-                f"Unable to reposition {self.name}"
+                f"Unable to reposition {self.name}: {result.error}"
             )
+
+    @callback
+    def _async_set_target_position(self, position: int | None) -> None:
+        """Assume the commanded position until the device confirms it."""
+        if self._unsub_target_timeout is not None:
+            self._unsub_target_timeout()
+            self._unsub_target_timeout = None
+
+        self._target_position = position
+        if position is not None:
+            self._unsub_target_timeout = async_call_later(
+                self.hass,
+                OPTIMISTIC_STATE_TIMEOUT,
+                self._async_target_timeout
+            )
+        self.async_write_ha_state()
+
+    @callback
+    def _async_target_timeout(self, _now: datetime) -> None:
+        """Roll back to the reported position if the target was never reached."""
+        self._unsub_target_timeout = None
+        LOGGER.debug(
+            "Cover %s did not reach position %s, rolling back to %s",
+            self.device_info[CONF_NAME],
+            self._target_position,
+            self.reported_absolute_position
+        )
+        self._async_set_target_position(None)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Reconcile the assumed position with the polled device data."""
+        if (self._target_position is not None
+                and self.device is not None
+                and self.reported_absolute_position == self._target_position):
+            self._async_set_target_position(None)
+            return
+        super()._handle_coordinator_update()
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Cancel the rollback timeout when the entity is removed."""
+        await super().async_will_remove_from_hass()
+        if self._unsub_target_timeout is not None:
+            self._unsub_target_timeout()
+            self._unsub_target_timeout = None
@@ -0,0 +1,62 @@
+
+
+"""Diagnostics support for the Sunsa integration."""
+
+
+from __future__ import annotations
+
+from dataclasses import asdict
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_API_KEY, CONF_EMAIL, CONF_NAME, CONF_WEBHOOK_ID
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, USER_ID
+from .coordinator import SunsaDataUpdateCoordinator
+
+TO_REDACT = {
+    CONF_API_KEY,
+    CONF_EMAIL,
+    USER_ID,
+    CONF_NAME,
+    CONF_WEBHOOK_ID,
+    "title",
+    "unique_id",
+}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant,
+    entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a Sunsa config entry."""
+    coordinator: SunsaDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
+    governor = coordinator.governor
+
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "polling": {
+            "update_interval": coordinator.update_interval.total_seconds(),
+            "last_update_success": coordinator.last_update_success,
+            "push_active": coordinator.push_active,
+            "pushes_received": coordinator.pushes_received,
+        },
+        "telemetry": coordinator.telemetry.as_dict(),
+        "governor": {
+            "requests_queued": governor.requests_queued,
+            "requests_delayed": governor.requests_delayed,
+            "requests_dropped": governor.requests_dropped,
+            "circuit_state": governor.circuit_breaker.state,
+        },
+        "session": governor.session.stats.as_dict(),
+        "commands_coalesced": coordinator.dispatcher.commands_coalesced,
+        "journaled_commands": (
+            None if coordinator.journal is None else len(coordinator.journal.positions)
+        ),
+        "devices": [
+            async_redact_data(asdict(device), TO_REDACT)
+            for device in coordinator.data.values()
+        ],
+    }
@@ -0,0 +1,160 @@
+
+
+"""Command dispatcher for the Sunsa integration."""
+
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from dataclasses import dataclass
+from time import monotonic
+
+from aiohttp import ClientError
+from pysunsa.exceptions import PysunsaError
+
+from homeassistant.core import HomeAssistant
+
+from .const import LOGGER, COMMAND_DEBOUNCE
+from .governor import CircuitOpenError, SunsaRequestGovernor, is_transient_error
+from .journal import SunsaCommandJournal
+from .telemetry import SunsaTelemetry
+
+
+@dataclass(frozen=True)
+class SunsaCommandResult:
+    """Outcome of a position command sent to a Sunsa device."""
+
+    sunsa_device_id: int
+    position: int
+    success: bool
+    elapsed: float
+    error: str | None = None
+    # The command failed but was journaled to be replayed later
+    queued: bool = False
+
+
+@dataclass
+class _PendingCommand:
+    """Latest position requested for a device and not sent yet."""
+
+    position: int
+    future: asyncio.Future[SunsaCommandResult]
+
+
+class SunsaCommandDispatcher:
+    """Sends position commands of an account with bounded concurrency."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        governor: SunsaRequestGovernor,
+        telemetry: SunsaTelemetry,
+        max_concurrency: int,
+        on_command_sent: Callable[[int, int], None],
+        journal: SunsaCommandJournal | None = None,
+    ) -> None:
+        """Initialize the dispatcher."""
+        self.hass = hass
+        self._governor = governor
+        self._telemetry = telemetry
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._on_command_sent = on_command_sent
+        self._journal = journal
+        self._pending: dict[int, _PendingCommand] = {}
+        # Number of commands superseded by a later one before being sent
+        self.commands_coalesced = 0
+
+    async def async_move(
+        self,
+        sunsa_device_id: int,
+        position: int
+    ) -> SunsaCommandResult:
+        """Move a device to an absolute position.
+
+        Commands to the same device within the debounce window are coalesced and
+        only the last position is sent. Every caller gets the result of the command
+        actually sent.
+        """
+        if (pending := self._pending.get(sunsa_device_id)) is not None:
+            pending.position = position
+            self.commands_coalesced += 1
+        else:
+            pending = self._pending[sunsa_device_id] = _PendingCommand(
+                position,
+                self.hass.loop.create_future()
+            )
+            self.hass.async_create_background_task(
+                self._async_flush(sunsa_device_id),
+                f"sunsa command to device {sunsa_device_id}"
+            )
+        return await asyncio.shield(pending.future)
+
+    async def _async_flush(self, sunsa_device_id: int) -> None:
+        """Send the pending command of a device once the debounce window ends."""
+        await asyncio.sleep(COMMAND_DEBOUNCE)
+        pending = self._pending.pop(sunsa_device_id)
+        try:
+            result = await self._async_send(sunsa_device_id, pending.position)
+        except Exception as error:  # pylint: disable=broad-except
+            pending.future.set_exception(error)
+        else:
+            pending.future.set_result(result)
+
+    async def _async_send(
+        self,
+        sunsa_device_id: int,
+        position: int
+    ) -> SunsaCommandResult:
+        """Send a position command through the governor."""
+        start = monotonic()
+        async with self._semaphore:
+            try:
+                await self._governor.async_update_device(sunsa_device_id, position)
+            except (
+                PysunsaError,
+                ClientError,
+                TimeoutError,
+                CircuitOpenError,
+            ) as error:
+                LOGGER.debug("Command to device %s failed: %r", sunsa_device_id, error)
+                if isinstance(error, TimeoutError):
+                    self._telemetry.command_timeouts += 1
+                else:
+                    self._telemetry.command_errors += 1
+                queued = self._journal is not None and (
+                    isinstance(error, CircuitOpenError) or is_transient_error(error)
+                )
+                if queued:
+                    self._journal.async_record(sunsa_device_id, position)
+                return SunsaCommandResult(
+                    sunsa_device_id,
+                    position,
+                    success=False,
+                    elapsed=monotonic() - start,
+                    error=str(error) or type(error).__name__,
+                    queued=queued,
+                )
+
+        elapsed = monotonic() - start
+        if self._journal is not None:
+            self._journal.async_discard(sunsa_device_id)
+        self._telemetry.command_latency.add(elapsed)
+        self._on_command_sent(sunsa_device_id, position)
+        return SunsaCommandResult(
+            sunsa_device_id,
+            position,
+            success=True,
+            elapsed=elapsed,
+        )
+
+    async def async_move_many(
+        self,
+        targets: dict[int, int]
+    ) -> dict[int, SunsaCommandResult]:
+        """Move several devices concurrently and return the result of each."""
+        results = await asyncio.gather(*(
+            self.async_move(sunsa_device_id, position)
+            for sunsa_device_id, position in targets.items()
+        ))
+        return {result.sunsa_device_id: result for result in results}
@@ -5,13 +5,13 @@
 
 from __future__ import annotations
 
-from typing import Any
-from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
 from homeassistant.helpers.entity import Entity
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import DOMAIN, IS_CONNECTED
+from .const import DOMAIN
 from .coordinator import SunsaDataUpdateCoordinator
+from .models import SunsaDevice
 
 
 class SunsaEntity(CoordinatorEntity[SunsaDataUpdateCoordinator], Entity):
@@ -28,7 +28,8 @@ class SunsaEntity(CoordinatorEntity[SunsaDataUpdateCoordinator], Entity):
 
         ) -> None:
         """Initialize the Sunsa entity."""
-        super().__init__(coordinator=coordinator)
+        # The device id as context so that the entity is only updated on changes
+        super().__init__(coordinator=coordinator, context=sunsa_device_id)
 
         self._attr_device_info = DeviceInfo(
             identifiers={(DOMAIN, device_name)},
@@ -45,9 +46,32 @@ class SunsaEntity(CoordinatorEntity[SunsaDataUpdateCoordinator], Entity):
         """Return the availability of the device that provides this sensor data."""
         return (super().available
                 and self.device is not None
-                and self.device.get(IS_CONNECTED) is True)
+                and self.device.is_connected)
 
     @property
-    def device(self) -> dict[str, Any] | None:
+    def device(self) -> SunsaDevice | None:
         """Get the device data from the coordinator."""
         return self.coordinator.data.get(self._sunsa_device_id)
+
+
+class SunsaAccountEntity(CoordinatorEntity[SunsaDataUpdateCoordinator], Entity):
+    """Defines an entity reporting on the Sunsa account itself."""
+
+    _attr_has_entity_name = True
+
+    def __init__(
+        self,
+        coordinator: SunsaDataUpdateCoordinator,
+        entity_description: str
+        ) -> None:
+        """Initialize the Sunsa account entity."""
+        super().__init__(coordinator=coordinator)
+
+        entry = coordinator.config_entry
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, entry.entry_id)},
+            name=entry.title,
+            manufacturer=DOMAIN.title(),
+            entry_type=DeviceEntryType.SERVICE,
+        )
+        self._attr_unique_id = f"{entry.unique_id}-{entity_description}"
@@ -0,0 +1,414 @@
+
+
+"""Request governor shared by all the calls to the Sunsa API of an account."""
+
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from enum import IntEnum, StrEnum
+from heapq import heappop, heappush
+from itertools import count
+import random
+from time import monotonic
+from typing import Any, TypeVar
+
+from aiohttp import ClientError, ClientResponseError
+from pysunsa import Pysunsa
+from pysunsa.exceptions import PysunsaError
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+
+from .const import (
+    DOMAIN,
+    LOGGER,
+    UPDATE_TIMEOUT,
+    DEFAULT_REQUEST_RATE,
+    REQUEST_BURST,
+    REQUEST_RETRIES,
+    REQUEST_RETRY_DELAY,
+    REQUEST_RETRY_MAX_DELAY,
+    RATE_LIMITED_DELAY,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_OPEN_DELAY,
+    CIRCUIT_MAX_OPEN_DELAY,
+    SUNSA_API_URL,
+)
+from .session import SunsaSession
+
+DATA_GOVERNORS = f"{DOMAIN}_governors"
+
+_T = TypeVar("_T")
+
+
+class RequestPriority(IntEnum):
+    """Priority lanes of the requests, lower values go first."""
+
+    USER = 0
+    BACKGROUND = 1
+
+
+class CircuitState(StrEnum):
+    """States of the circuit breaker."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the Sunsa cloud is unavailable."""
+
+    def __init__(self, retry_in: float) -> None:
+        """Initialize the error with the seconds until the next probe."""
+        super().__init__(
+            f"Sunsa cloud is unavailable, retrying in {retry_in:.0f} seconds"
+        )
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Circuit breaker that stops sending requests during cloud outages.
+
+    The circuit opens after consecutive failed requests. While open, requests fail
+    immediately until the open delay ends, then a single probe request is let
+    through. The circuit closes if the probe succeeds, or opens again for twice
+    as long if it fails.
+    """
+
+    def __init__(self) -> None:
+        """Initialize a closed circuit."""
+        self.state = CircuitState.CLOSED
+        self._failures = 0
+        self._open_delay = CIRCUIT_OPEN_DELAY
+        self._probe_at = 0.0
+        self._listeners: list[Callable[[CircuitState], None]] = []
+
+    @callback
+    def async_add_listener(
+        self,
+        state_callback: Callable[[CircuitState], None]
+    ) -> CALLBACK_TYPE:
+        """Listen for state changes of the circuit."""
+        self._listeners.append(state_callback)
+
+        @callback
+        def remove_listener() -> None:
+            """Remove the state listener."""
+            self._listeners.remove(state_callback)
+
+        return remove_listener
+
+    @property
+    def retry_in(self) -> float:
+        """Return the seconds until a probe request is allowed."""
+        return max(0.0, self._probe_at - monotonic())
+
+    @callback
+    def async_before_request(self) -> bool:
+        """Raise CircuitOpenError unless a request may be sent.
+
+        Return true if the request is the probe of an open circuit.
+        """
+        if self.state is CircuitState.CLOSED:
+            return False
+        if self.state is CircuitState.OPEN and self.retry_in == 0:
+            self._async_set_state(CircuitState.HALF_OPEN)
+            return True
+        # Open, or half open with the probe request in flight
+        raise CircuitOpenError(self.retry_in)
+
+    @callback
+    def async_abort_probe(self) -> None:
+        """Open the circuit again when the probe ended without an outcome.
+
+        The next request is let through as a new probe.
+        """
+        if self.state is CircuitState.HALF_OPEN:
+            self._async_set_state(CircuitState.OPEN)
+
+    @callback
+    def async_record_success(self) -> None:
+        """Close the circuit after a request reached the cloud."""
+        self._failures = 0
+        self._open_delay = CIRCUIT_OPEN_DELAY
+        if self.state is not CircuitState.CLOSED:
+            self._async_set_state(CircuitState.CLOSED)
+
+    @callback
+    def async_record_failure(self) -> None:
+        """Count a request that failed to reach the cloud."""
+        self._failures += 1
+        if self.state is CircuitState.HALF_OPEN:
+            self._open_delay = min(self._open_delay * 2, CIRCUIT_MAX_OPEN_DELAY)
+        elif self._failures < CIRCUIT_FAILURE_THRESHOLD:
+            return
+        self._probe_at = monotonic() + self._open_delay
+        if self.state is not CircuitState.OPEN:
+            self._async_set_state(CircuitState.OPEN)
+
+    @callback
+    def _async_set_state(self, state: CircuitState) -> None:
+        """Change the state of the circuit and notify the listeners."""
+        LOGGER.debug("Sunsa circuit breaker is now %s", state)
+        self.state = state
+        for state_callback in list(self._listeners):
+            state_callback(state)
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Return true if the request that raised the error can be retried."""
+    if isinstance(error, PysunsaError):
+        return error.status_code is None or error.status_code == 429 \
+            or error.status_code >= 500
+    if isinstance(error, ClientResponseError):
+        return error.status == 429 or error.status >= 500
+    # Connection errors, e.g. refused connections or DNS failures
+    return isinstance(error, (ClientError, TimeoutError))
+
+
+class TokenBucket:
+    """Token bucket rate limiter."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        """Initialize a full bucket refilled with `rate` tokens per second."""
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = monotonic()
+
+    def _refill(self) -> None:
+        """Add the tokens accrued since the last refill."""
+        now = monotonic()
+        self._tokens = min(
+            self.capacity,
+            self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def try_take(self) -> bool:
+        """Take a token if one is available."""
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def delay(self) -> float:
+        """Return the seconds until a token is available."""
+        self._refill()
+        return max(0.0, (1 - self._tokens) / self.rate)
+
+
+@callback
+def async_get_governor(
+    hass: HomeAssistant,
+    user_id: int,
+    api_key: str
+) -> SunsaRequestGovernor:
+    """Return the request governor of a Sunsa account.
+
+    The API key only initializes a new governor, the key of an existing one is
+    changed explicitly.
+    """
+    governors: dict[int, SunsaRequestGovernor] = hass.data.setdefault(
+        DATA_GOVERNORS, {}
+    )
+    if (governor := governors.get(user_id)) is None:
+        governor = governors[user_id] = SunsaRequestGovernor(hass, user_id, api_key)
+    return governor
+
+
+@callback
+def async_get_active_governor(
+    hass: HomeAssistant,
+    user_id: int
+) -> SunsaRequestGovernor | None:
+    """Return the request governor of an account in use, if any."""
+    return hass.data.get(DATA_GOVERNORS, {}).get(user_id)
+
+
+async def async_release_governor(hass: HomeAssistant, user_id: int) -> None:
+    """Close the governor of an account no longer used by any config entry."""
+    governors: dict[int, SunsaRequestGovernor] = hass.data.get(DATA_GOVERNORS, {})
+    if (governor := governors.pop(user_id, None)) is not None:
+        await governor.session.async_close()
+
+
+class SunsaRequestGovernor:
+    """Paces, prioritizes and retries the requests to the Sunsa API of an account.
+
+    All requests take a token from a shared bucket. When no token is available the
+    request is queued, and queued user requests go ahead of background polls.
+    Transient errors are retried with exponential backoff and jitter.
+    """
+
+    def __init__(self, hass: HomeAssistant, user_id: int, api_key: str) -> None:
+        """Initialize the governor."""
+        self.hass = hass
+        self.user_id = user_id
+        self.api_key = api_key
+        self.session = SunsaSession(hass, on_retry_after=self.async_defer)
+        self.sunsa = Pysunsa(self.session.client_session, user_id, api_key)
+        self.circuit_breaker = CircuitBreaker()
+        self._bucket = TokenBucket(DEFAULT_REQUEST_RATE, REQUEST_BURST)
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._sequence = count()
+        self._wake_handle: asyncio.TimerHandle | None = None
+        # Requests are held until then, as asked by a rate limited response
+        self._deferred_until = 0.0
+        # Requests that waited for a token, were retried or given up on
+        self.requests_queued = 0
+        self.requests_delayed = 0
+        self.requests_dropped = 0
+
+    @callback
+    def async_set_api_key(self, api_key: str) -> None:
+        """Use new credentials for the following requests."""
+        self.api_key = api_key
+        self.sunsa = Pysunsa(self.session.client_session, self.user_id, api_key)
+
+    @callback
+    def async_set_rate(self, rate: float) -> None:
+        """Set the sustained number of requests per second."""
+        self._bucket.rate = rate
+
+    @callback
+    def async_defer(self, delay: float) -> None:
+        """Hold all requests for the given seconds, e.g. as set by Retry-After."""
+        self._deferred_until = max(self._deferred_until, monotonic() + delay)
+        LOGGER.debug("Holding Sunsa requests for %.1f seconds", delay)
+
+    async def async_warm_up(self) -> None:
+        """Open a connection to the Sunsa cloud so that the next request reuses it."""
+        if self.circuit_breaker.state is not CircuitState.CLOSED:
+            return
+        try:
+            async with asyncio.timeout(UPDATE_TIMEOUT):
+                async with self.session.client_session.head(SUNSA_API_URL):
+                    pass
+        except (ClientError, TimeoutError) as error:
+            LOGGER.debug("Unable to warm up the connection to Sunsa: %r", error)
+
+    async def async_validate_api_key(self, api_key: str) -> list[dict[str, Any]]:
+        """Fetch the devices with an API key without using it for other requests."""
+        sunsa = Pysunsa(self.session.client_session, self.user_id, api_key)
+        return await self._async_request(
+            lambda: sunsa.get_devices(),
+            RequestPriority.USER,
+            retries=0
+        )
+
+    async def async_get_devices(
+        self,
+        priority: RequestPriority = RequestPriority.BACKGROUND,
+        retries: int = REQUEST_RETRIES
+    ) -> list[dict[str, Any]]:
+        """Fetch the data of all the devices of the account."""
+        return await self._async_request(
+            lambda: self.sunsa.get_devices(),
+            priority,
+            retries
+        )
+
+    async def async_update_device(self, sunsa_device_id: int, position: int) -> None:
+        """Move a device to an absolute position."""
+        await self._async_request(
+            lambda: self.sunsa.update_device(sunsa_device_id, position),
+            RequestPriority.USER,
+            REQUEST_RETRIES
+        )
+
+    async def _async_request(
+        self,
+        request: Callable[[], Awaitable[_T]],
+        priority: RequestPriority,
+        retries: int
+    ) -> _T:
+        """Send a request when allowed, retrying transient errors.
+
+        Raise CircuitOpenError without sending the request if the circuit is open.
+        """
+        attempt = 0
+        while True:
+            probe = self.circuit_breaker.async_before_request()
+            retry_afters = self.session.stats.retry_afters
+            try:
+                await self._async_acquire(priority)
+                async with asyncio.timeout(UPDATE_TIMEOUT):
+                    result = await request()
+            except (PysunsaError, ClientError, TimeoutError) as error:
+                if not is_transient_error(error):
+                    # The cloud is reachable even if it rejected the request
+                    self.circuit_breaker.async_record_success()
+                    raise
+                if (isinstance(error, PysunsaError) and error.status_code == 429
+                        and self.session.stats.retry_afters == retry_afters):
+                    # Unless the session held the requests as long as the response
+                    # asked with Retry-After
+                    self.async_defer(RATE_LIMITED_DELAY)
+                if (attempt >= retries
+                        or self.circuit_breaker.state is not CircuitState.CLOSED):
+                    self.requests_dropped += 1
+                    self.circuit_breaker.async_record_failure()
+                    raise
+
+                attempt += 1
+                self.requests_delayed += 1
+                delay = random.uniform(0.5, 1) * min(
+                    REQUEST_RETRY_DELAY * 2 ** (attempt - 1),
+                    REQUEST_RETRY_MAX_DELAY
+                )
+                LOGGER.debug(
+                    "Retrying Sunsa request in %.1f seconds after error: %r",
+                    delay,
+                    error
+                )
+                await asyncio.sleep(delay)
+            except BaseException:
+                # Cancelled or failed unexpectedly, the probe didn't tell whether
+                # the cloud is back
+                if probe:
+                    self.circuit_breaker.async_abort_probe()
+                raise
+            else:
+                self.circuit_breaker.async_record_success()
+                return result
+
+    def _try_take(self) -> bool:
+        """Take a token unless requests are being held."""
+        return monotonic() >= self._deferred_until and self._bucket.try_take()
+
+    async def _async_acquire(self, priority: RequestPriority) -> None:
+        """Wait for the turn of a request in its priority lane."""
+        if not self._waiters and self._try_take():
+            return
+
+        self.requests_queued += 1
+        future: asyncio.Future[None] = self.hass.loop.create_future()
+        heappush(self._waiters, (priority, next(self._sequence), future))
+        self._async_schedule_wake()
+        await future
+
+    @callback
+    def _async_schedule_wake(self) -> None:
+        """Wake the queued requests when the next token is available."""
+        if self._wake_handle is not None:
+            return
+        delay = max(self._deferred_until - monotonic(), self._bucket.delay())
+        self._wake_handle = self.hass.loop.call_later(delay, self._async_wake)
+
+    @callback
+    def _async_wake(self) -> None:
+        """Let queued requests go in priority order while tokens are available."""
+        self._wake_handle = None
+        while self._waiters:
+            if self._waiters[0][2].done():
+                # The request was cancelled while queued
+                heappop(self._waiters)
+                continue
+            if not self._try_take():
+                self._async_schedule_wake()
+                return
+            heappop(self._waiters)[2].set_result(None)
@@ -0,0 +1,258 @@
+
+
+"""Compact per wand history for the Sunsa integration."""
+
+
+from __future__ import annotations
+
+from array import array
+from base64 import b64decode, b64encode
+import math
+from time import time
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    DOMAIN,
+    LOGGER,
+    STORAGE_VERSION,
+    HISTORY_SIZE,
+    HISTORY_SAMPLE_INTERVAL,
+    HISTORY_SAVE_DELAY,
+    HISTORY_MIN_DRAIN_SPAN,
+)
+from .models import SunsaDevice
+
+SECONDS_PER_DAY = 86400
+# Typecodes of the sampled values: timestamp, battery, temperature and move count
+_FIELDS = ("d", "f", "f", "I")
+
+
+def history_store(hass: HomeAssistant, entry_id: str) -> Store[dict[str, Any]]:
+    """Return the store of the wand history of a config entry."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.history")
+
+
+class WandHistory:
+    """Fixed size ring buffers of the samples of a wand.
+
+    Adding a sample is O(1) and the memory used doesn't grow. The battery drain
+    is only fitted when read after new samples. Missing values are stored as NaN.
+    """
+
+    __slots__ = (
+        "timestamps",
+        "battery",
+        "temperature",
+        "moves",
+        "index",
+        "count",
+        "move_count",
+        "_drain_rate",
+        "_drain_rate_stale",
+    )
+
+    def __init__(self) -> None:
+        """Initialize empty buffers."""
+        self.timestamps, self.battery, self.temperature, self.moves = (
+            array(typecode, [0]) * HISTORY_SIZE for typecode in _FIELDS
+        )
+        # Slot of the next sample and number of samples stored
+        self.index = 0
+        self.count = 0
+        # Moves since the history started
+        self.move_count = 0
+        # Battery drain fitted on the samples, refitted when read after a sample
+        self._drain_rate: float | None = None
+        self._drain_rate_stale = False
+
+    @property
+    def buffers(self) -> tuple[array, ...]:
+        """Return the buffers of the sampled values."""
+        return self.timestamps, self.battery, self.temperature, self.moves
+
+    def add(self, timestamp: float, device: SunsaDevice) -> None:
+        """Add a sample of the current device data."""
+        index = self.index
+        self.timestamps[index] = timestamp
+        self.battery[index] = _nan_if_none(device.battery_percentage)
+        self.temperature[index] = _nan_if_none(device.temperature)
+        self.moves[index] = self.move_count
+        self.index = (index + 1) % HISTORY_SIZE
+        self.count = min(self.count + 1, HISTORY_SIZE)
+        self._drain_rate_stale = True
+
+    @property
+    def drain_rate(self) -> float | None:
+        """Return the battery percentage points lost per day."""
+        if self._drain_rate_stale:
+            self._drain_rate = self._compute_drain_rate()
+            self._drain_rate_stale = False
+        return self._drain_rate
+
+    def _ordered(self, buffer: array) -> list[float]:
+        """Return the samples of a buffer from the oldest to the newest."""
+        start = (self.index - self.count) % HISTORY_SIZE
+        if start + self.count <= HISTORY_SIZE:
+            return buffer[start:start + self.count].tolist()
+        return buffer[start:].tolist() + buffer[:self.index].tolist()
+
+    def _compute_drain_rate(self) -> float | None:
+        """Return the least squares battery drain since the last recharge."""
+        samples = [
+            (timestamp, battery)
+            for timestamp, battery in zip(
+                self._ordered(self.timestamps), self._ordered(self.battery)
+            )
+            if not math.isnan(battery)
+        ]
+        # Only the discharge since the battery was last charged
+        for position in range(len(samples) - 1, 0, -1):
+            if samples[position][1] > samples[position - 1][1] + 1:
+                samples = samples[position:]
+                break
+        if len(samples) < 2 or samples[-1][0] - samples[0][0] < HISTORY_MIN_DRAIN_SPAN:
+            return None
+
+        mean_time = sum(timestamp for timestamp, _ in samples) / len(samples)
+        mean_battery = sum(battery for _, battery in samples) / len(samples)
+        covariance = sum(
+            (timestamp - mean_time) * (battery - mean_battery)
+            for timestamp, battery in samples
+        )
+        variance = sum((timestamp - mean_time) ** 2 for timestamp, _ in samples)
+        return max(0.0, -covariance / variance * SECONDS_PER_DAY)
+
+    def days_to_empty(self, battery_percentage: int | None) -> float | None:
+        """Return the days until the battery is empty at the current drain rate."""
+        if not self.drain_rate or battery_percentage is None:
+            return None
+        return battery_percentage / self.drain_rate
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the history in a compact serializable form."""
+        return {
+            "index": self.index,
+            "count": self.count,
+            "move_count": self.move_count,
+            "samples": b64encode(
+                b"".join(buffer.tobytes() for buffer in self.buffers)
+            ).decode(),
+        }
+
+    @classmethod
+    def from_dict(cls, stored: dict[str, Any]) -> WandHistory:
+        """Restore a history from its serialized form.
+
+        Raises ValueError if the stored buffers don't match the history size.
+        """
+        history = cls()
+        history.index = stored["index"]
+        history.count = stored["count"]
+        history.move_count = stored["move_count"]
+        if not (0 <= history.index < HISTORY_SIZE
+                and 0 <= history.count <= HISTORY_SIZE):
+            raise ValueError(
+                f"Sample {history.index} of {history.count} out of {HISTORY_SIZE}"
+            )
+        samples = b64decode(stored["samples"])
+        sizes = [buffer.itemsize * HISTORY_SIZE for buffer in history.buffers]
+        if len(samples) != sum(sizes):
+            raise ValueError(f"{len(samples)} bytes of samples, expected {sum(sizes)}")
+        offset = 0
+        for buffer, size in zip(history.buffers, sizes):
+            # Overwritten in place, the buffers keep their size
+            memoryview(buffer).cast("B")[:] = samples[offset:offset + size]
+            offset += size
+        history._drain_rate_stale = True
+        return history
+
+
+def _nan_if_none(value: float | None) -> float:
+    """Return NaN for a missing value."""
+    return math.nan if value is None else value
+
+
+class SunsaHistory:
+    """Histories of the wands of an account, sampled on polls."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialize the histories."""
+        self._store = history_store(hass, entry_id)
+        self.wands: dict[int, WandHistory] = {}
+        self._last_sample = 0.0
+        self._listeners: list[CALLBACK_TYPE] = []
+
+    async def async_load(self) -> None:
+        """Load the persisted histories."""
+        if (stored := await self._store.async_load()) is None:
+            return
+        try:
+            self.wands = {
+                int(sunsa_device_id): WandHistory.from_dict(wand)
+                for sunsa_device_id, wand in stored["wands"].items()
+            }
+        except (KeyError, TypeError, ValueError) as error:
+            # The history is rebuilt, e.g. after the buffer size changed
+            LOGGER.debug("Ignoring the stored wand history: %r", error)
+            return
+        self._last_sample = stored["last_sample"]
+
+    @callback
+    def async_add_listener(self, sample_callback: CALLBACK_TYPE) -> CALLBACK_TYPE:
+        """Listen for the samples of the wands."""
+        self._listeners.append(sample_callback)
+
+        @callback
+        def remove_listener() -> None:
+            """Remove the sample listener."""
+            self._listeners.remove(sample_callback)
+
+        return remove_listener
+
+    @callback
+    def async_record(
+        self,
+        previous: dict[int, SunsaDevice] | None,
+        data: dict[int, SunsaDevice],
+        changed_device_ids: set[int]
+    ) -> None:
+        """Count the moves of the changed devices and sample all when due."""
+        if previous is not None:
+            for sunsa_device_id in changed_device_ids:
+                if (sunsa_device_id in previous
+                        and sunsa_device_id in data
+                        and previous[sunsa_device_id].position
+                        != data[sunsa_device_id].position):
+                    self._wand(sunsa_device_id).move_count += 1
+
+        now = time()
+        if now - self._last_sample < HISTORY_SAMPLE_INTERVAL:
+            return
+        self._last_sample = now
+        for sunsa_device_id, device in data.items():
+            self._wand(sunsa_device_id).add(now, device)
+        for sunsa_device_id in self.wands.keys() - data.keys():
+            del self.wands[sunsa_device_id]
+        self._store.async_delay_save(self._data_to_save, HISTORY_SAVE_DELAY)
+        for sample_callback in list(self._listeners):
+            sample_callback()
+
+    def _wand(self, sunsa_device_id: int) -> WandHistory:
+        """Return the history of a wand, starting it if needed."""
+        if (wand := self.wands.get(sunsa_device_id)) is None:
+            wand = self.wands[sunsa_device_id] = WandHistory()
+        return wand
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the histories to persist."""
+        return {
+            "last_sample": self._last_sample,
+            "wands": {
+                sunsa_device_id: wand.as_dict()
+                for sunsa_device_id, wand in self.wands.items()
+            },
+        }
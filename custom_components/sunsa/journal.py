@@ -0,0 +1,109 @@
+
+
+"""Journal of the commands that could not reach the Sunsa cloud."""
+
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    DOMAIN,
+    LOGGER,
+    STORAGE_VERSION,
+    JOURNAL_SAVE_DELAY,
+    JOURNAL_MAX_REPLAYS,
+)
+from .models import SunsaDevice
+
+
+def journal_store(hass: HomeAssistant, entry_id: str) -> Store[dict[str, Any]]:
+    """Return the store of the command journal of a config entry."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.journal")
+
+
+class SunsaCommandJournal:
+    """Latest position intended for each device and not delivered yet.
+
+    A command is journaled when it fails to reach the cloud and dropped when a
+    later command to the same device is delivered, or when its replays keep
+    failing. The journal is persisted so that the commands survive a restart.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialize an empty journal."""
+        self._store = journal_store(hass, entry_id)
+        self.positions: dict[int, int] = {}
+        # Number of times the journaled command of a device was replayed
+        self.replays: dict[int, int] = {}
+
+    async def async_load(self) -> None:
+        """Load the commands journaled before the last restart."""
+        if (journal := await self._store.async_load()) is not None:
+            self.positions = {
+                int(sunsa_device_id): position
+                for sunsa_device_id, position in journal["positions"].items()
+            }
+            self.replays = {
+                int(sunsa_device_id): replays
+                for sunsa_device_id, replays in journal.get("replays", {}).items()
+            }
+            LOGGER.debug("Loaded %s journaled commands", len(self.positions))
+
+    @callback
+    def async_record(self, sunsa_device_id: int, position: int) -> None:
+        """Journal the position of a command that did not reach the cloud."""
+        self.positions[sunsa_device_id] = position
+        self._async_schedule_save()
+
+    @callback
+    def async_discard(self, sunsa_device_id: int) -> None:
+        """Drop the journaled command of a device."""
+        self.replays.pop(sunsa_device_id, None)
+        if self.positions.pop(sunsa_device_id, None) is not None:
+            self._async_schedule_save()
+
+    @callback
+    def async_pop_pending(self, data: dict[int, SunsaDevice]) -> dict[int, int]:
+        """Return the journaled commands to replay and clear the journal.
+
+        Commands to devices that are gone or already at their target are dropped,
+        and so are those replayed too many times already. Failed replays are
+        journaled again by the dispatcher.
+        """
+        pending = {
+            sunsa_device_id: position
+            for sunsa_device_id, position in self.positions.items()
+            if sunsa_device_id in data and data[sunsa_device_id].position != position
+        }
+        self.replays = {
+            sunsa_device_id: self.replays.get(sunsa_device_id, 0) + 1
+            for sunsa_device_id in pending
+        }
+        if given_up := [
+            sunsa_device_id
+            for sunsa_device_id, replays in self.replays.items()
+            if replays > JOURNAL_MAX_REPLAYS
+        ]:
+            LOGGER.warning(
+                "Giving up on the journaled commands of devices %s after %s replays",
+                given_up,
+                JOURNAL_MAX_REPLAYS
+            )
+            for sunsa_device_id in given_up:
+                del pending[sunsa_device_id]
+                del self.replays[sunsa_device_id]
+        self.positions = {}
+        self._async_schedule_save()
+        return pending
+
+    @callback
+    def _async_schedule_save(self) -> None:
+        """Persist the journal after a short delay."""
+        self._store.async_delay_save(
+            lambda: {"positions": self.positions, "replays": self.replays},
+            JOURNAL_SAVE_DELAY
+        )
@@ -0,0 +1,88 @@
+
+
+"""Device state model for the Sunsa integration."""
+
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+from homeassistant.const import ATTR_TEMPERATURE, CONF_NAME
+
+from pysunsa import CLOSED_POSITION, OPEN_POSITION, RIGHT, DOWN
+
+from .const import (
+    IDDEVICE,
+    IS_CONNECTED,
+    ATTR_POSITION,
+    BATTERY_PERCENTAGE,
+    BLIND_TYPE,
+    DEFAULT_SMART_HOME_DIRECTION,
+    TEXT,
+    VALUE,
+)
+
+
+@dataclass(frozen=True, slots=True)
+class SunsaDevice:
+    """State of a Sunsa wand, parsed once per poll from the API payload."""
+
+    id: int
+    name: str
+    is_connected: bool
+    # Absolute position in [-100, 100], 0 being fully open
+    position: int | None
+    battery_percentage: int | None
+    temperature: float | None
+    blind_type: str
+    default_smart_home_direction: str
+    # Values derived from the payload
+    orientation: str
+    closing_direction: int
+    cover_position: int | None
+    icon: str
+
+    @classmethod
+    def from_payload(cls, payload: dict[str, Any]) -> SunsaDevice:
+        """Parse a device payload as returned by the Sunsa API.
+
+        Raise KeyError, TypeError or ValueError if the payload doesn't have the
+        expected shape.
+        """
+        position = _optional(int, payload.get(ATTR_POSITION))
+        temperature = payload.get(ATTR_TEMPERATURE)
+        blind_type = str(payload[BLIND_TYPE][TEXT])
+        direction = str(payload[DEFAULT_SMART_HOME_DIRECTION][TEXT])
+
+        orientation = "vertical" if blind_type.lower() == "vertical" else "horizontal"
+        cover_position = (
+            None if position is None else CLOSED_POSITION - abs(position)
+        )
+        icon = f"mdi:blinds-{orientation}"
+        if cover_position == OPEN_POSITION:
+            icon += "-closed"
+
+        return cls(
+            id=int(payload[IDDEVICE]),
+            name=str(payload[CONF_NAME]),
+            is_connected=payload.get(IS_CONNECTED) is True,
+            position=position,
+            battery_percentage=_optional(int, payload.get(BATTERY_PERCENTAGE)),
+            temperature=_optional(
+                float, temperature.get(VALUE) if temperature is not None else None
+            ),
+            blind_type=blind_type.lower(),
+            default_smart_home_direction=direction.lower(),
+            orientation=orientation,
+            # 1 for right or down if a vertical or horizontal blind, respectively.
+            # -1 for left or up if a vertical or horizontal blind, respectively.
+            closing_direction=1 if direction in (RIGHT, DOWN) else -1,
+            cover_position=cover_position,
+            icon=icon,
+        )
+
+
+def _optional(kind: type, value: Any) -> Any:
+    """Convert a value that may be missing from the payload."""
+    return None if value is None else kind(value)
@@ -0,0 +1,205 @@
+
+
+"""Sun tracking planner for the Sunsa integration."""
+
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_state_change_event
+from homeassistant.helpers.storage import Store
+
+from pysunsa import CLOSED_POSITION
+
+from .const import DOMAIN, LOGGER, STORAGE_VERSION
+
+if TYPE_CHECKING:
+    from .coordinator import SunsaDataUpdateCoordinator
+
+SUN_ENTITY_ID = "sun.sun"
+ATTR_AZIMUTH = "azimuth"
+ATTR_ELEVATION = "elevation"
+
+
+def planner_store(hass: HomeAssistant, entry_id: str) -> Store[dict[str, Any]]:
+    """Return the store of the sun tracking settings of a config entry."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.planner")
+
+
+def plan_positions(
+    sun_azimuth: float,
+    sun_elevation: float,
+    window_azimuths: np.ndarray,
+    vertical: np.ndarray,
+    closing_directions: np.ndarray
+) -> np.ndarray:
+    """Return the absolute positions that block the direct sun on each window.
+
+    Slats are tilted to the cutoff angle, 90 - 2 * the incidence angle of the sun
+    on the slats, which blocks direct sun for slats as wide as their spacing.
+    Horizontal slats use the profile angle of the sun and vertical slats its
+    horizontal angle to the window. Windows the sun doesn't shine on are opened.
+    """
+    # Horizontal angle of the sun to the normal of each window, in [-180, 180)
+    relative_azimuths = (sun_azimuth - window_azimuths + 180) % 360 - 180
+    sunlit = np.abs(relative_azimuths) < 90
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        profile_angles = np.degrees(np.arctan2(
+            np.tan(np.radians(sun_elevation)),
+            np.cos(np.radians(relative_azimuths))
+        ))
+    incidence_angles = np.where(vertical, np.abs(relative_azimuths), profile_angles)
+    tilts = np.clip(90 - 2 * incidence_angles, 0, 90)
+
+    positions = np.rint(tilts / 90 * CLOSED_POSITION) * closing_directions
+    return np.where(sunlit, positions, 0).astype(int)
+
+
+class SunsaSunTracker:
+    """Moves the wands of an account to block the direct sun on their window.
+
+    On every sun update, the positions of all the tracked wands are computed in
+    one array operation, and only the wands whose position is off by more than
+    the threshold are commanded.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        coordinator: SunsaDataUpdateCoordinator,
+        threshold: int
+    ) -> None:
+        """Initialize the tracker."""
+        self.hass = hass
+        self.coordinator = coordinator
+        self.threshold = threshold
+        self._store = planner_store(hass, coordinator.config_entry.entry_id)
+        # Azimuth of the window of each tracked wand, keyed by idDevice
+        self.window_azimuths: dict[int, float] = {}
+        # Position delivered to each wand until it reports it, or the coordinator
+        # stops waiting for it
+        self._planned_positions: dict[int, int] = {}
+
+    async def async_load(self) -> None:
+        """Load the window azimuths of the tracked wands."""
+        if (settings := await self._store.async_load()) is not None:
+            self.window_azimuths = {
+                int(sunsa_device_id): azimuth
+                for sunsa_device_id, azimuth in settings["window_azimuths"].items()
+            }
+
+    @callback
+    def async_start(self) -> Callable[[], None]:
+        """Track the sun and return the callback that stops tracking it."""
+        unsub_sun = async_track_state_change_event(
+            self.hass, SUN_ENTITY_ID, self._async_sun_changed
+        )
+        unsub_coordinator = self.coordinator.async_add_listener(
+            self._async_reconcile
+        )
+
+        @callback
+        def stop() -> None:
+            """Stop tracking the sun."""
+            unsub_sun()
+            unsub_coordinator()
+
+        return stop
+
+    @callback
+    def _async_reconcile(self) -> None:
+        """Forget the planned positions the wands reported or won't reach.
+
+        A wand is then compared with the position it reports, so that one moved by
+        hand is corrected on the next sun update.
+        """
+        if not self._planned_positions:
+            return
+        data = self.coordinator.data
+        pending_targets = self.coordinator.pending_targets
+        self._planned_positions = {
+            sunsa_device_id: position
+            for sunsa_device_id, position in self._planned_positions.items()
+            if sunsa_device_id in data
+            and data[sunsa_device_id].position != position
+            and pending_targets.get(sunsa_device_id) == position
+        }
+
+    @callback
+    def async_set_window_azimuth(
+        self,
+        sunsa_device_id: int,
+        azimuth: float | None
+    ) -> None:
+        """Track the sun for a wand on a window facing the azimuth, or stop if None."""
+        self._planned_positions.pop(sunsa_device_id, None)
+        if azimuth is None:
+            self.window_azimuths.pop(sunsa_device_id, None)
+        else:
+            self.window_azimuths[sunsa_device_id] = azimuth
+        self._store.async_delay_save(
+            lambda: {"window_azimuths": self.window_azimuths}
+        )
+        if (sun := self.hass.states.get(SUN_ENTITY_ID)) is not None:
+            self._async_plan(sun.attributes)
+
+    @callback
+    def _async_sun_changed(self, event: Event) -> None:
+        """Plan the positions when the sun moved."""
+        if (sun := event.data["new_state"]) is not None:
+            self._async_plan(sun.attributes)
+
+    @callback
+    def _async_plan(self, sun: dict[str, Any]) -> None:
+        """Command the wands whose position is off from the planned one."""
+        data = self.coordinator.data
+        devices = [
+            data[sunsa_device_id]
+            for sunsa_device_id in self.window_azimuths
+            if sunsa_device_id in data
+            and data[sunsa_device_id].position is not None
+        ]
+        if (not devices
+                or ATTR_AZIMUTH not in sun
+                or sun.get(ATTR_ELEVATION, 0) <= 0):
+            # Nothing to track, or the sun is down
+            return
+
+        positions = plan_positions(
+            float(sun[ATTR_AZIMUTH]),
+            float(sun[ATTR_ELEVATION]),
+            np.array([self.window_azimuths[device.id] for device in devices]),
+            np.array([device.orientation == "vertical" for device in devices]),
+            np.array([device.closing_direction for device in devices]),
+        )
+        current = np.array([
+            self._planned_positions.get(device.id, device.position)
+            for device in devices
+        ])
+        moves = {
+            devices[index].id: int(positions[index])
+            for index in np.flatnonzero(np.abs(positions - current) > self.threshold)
+        }
+        if moves:
+            LOGGER.debug("Sun tracking moves: %s", moves)
+            self.coordinator.config_entry.async_create_background_task(
+                self.hass,
+                self._async_move(moves),
+                f"{DOMAIN} sun tracking"
+            )
+
+    async def _async_move(self, moves: dict[int, int]) -> None:
+        """Send the planned positions and keep those delivered."""
+        results = await self.coordinator.dispatcher.async_move_many(moves)
+        for sunsa_device_id, result in results.items():
+            if result.success:
+                self._planned_positions[sunsa_device_id] = result.position
+            else:
+                # Planned again from the reported position on the next sun update
+                self._planned_positions.pop(sunsa_device_id, None)
@@ -0,0 +1,77 @@
+"""Named positions of the wands of a Sunsa account."""
+
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, STORAGE_VERSION
+from .models import SunsaDevice
+
+
+def presets_store(hass: HomeAssistant, entry_id: str) -> Store[dict[str, Any]]:
+    """Return the store of the presets of a config entry."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.presets")
+
+
+class SunsaPresets:
+    """Absolute position of each wand of a preset, keyed by preset name."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialize without presets."""
+        self._store = presets_store(hass, entry_id)
+        self.presets: dict[str, dict[int, int]] = {}
+
+    async def async_load(self) -> None:
+        """Load the stored presets."""
+        if (presets := await self._store.async_load()) is not None:
+            self.presets = {
+                name: {
+                    int(sunsa_device_id): position
+                    for sunsa_device_id, position in positions.items()
+                }
+                for name, positions in presets["presets"].items()
+            }
+
+    @callback
+    def async_save_preset(self, name: str, positions: dict[int, int]) -> None:
+        """Store the positions of a preset, replacing those of the same name."""
+        self.presets[name] = positions
+        self._store.async_delay_save(lambda: {"presets": self.presets})
+
+    @callback
+    def async_delete_preset(self, name: str) -> bool:
+        """Delete a preset and return whether it existed."""
+        if self.presets.pop(name, None) is None:
+            return False
+        self._store.async_delay_save(lambda: {"presets": self.presets})
+        return True
+
+    def moves(
+        self,
+        name: str,
+        data: dict[int, SunsaDevice],
+        expected_positions: dict[int, int],
+        tolerance: int
+    ) -> tuple[dict[int, int], int]:
+        """Return the positions to command for a preset and the number skipped.
+
+        Wands already within the tolerance of their preset position, or heading to
+        it, are skipped. Wands no longer in the account are left out.
+        """
+        targets: dict[int, int] = {}
+        skipped = 0
+        for sunsa_device_id, position in self.presets[name].items():
+            if sunsa_device_id not in data:
+                continue
+            current = expected_positions.get(
+                sunsa_device_id, data[sunsa_device_id].position
+            )
+            if current is not None and abs(current - position) <= tolerance:
+                skipped += 1
+            else:
+                targets[sunsa_device_id] = position
+        return targets, skipped
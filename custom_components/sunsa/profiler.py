@@ -0,0 +1,107 @@
+
+
+"""On-demand profiling of the Sunsa integration."""
+
+
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import pstats
+from time import monotonic, strftime
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+
+from .const import DOMAIN, LOGGER, PROFILE_TOP_FUNCTIONS
+from .coordinator import SunsaDataUpdateCoordinator
+
+
+async def async_profile(
+    hass: HomeAssistant,
+    coordinators: list[SunsaDataUpdateCoordinator],
+    duration: float,
+    cycles: int | None
+) -> dict[str, Any]:
+    """Profile the event loop for a duration or a number of poll cycles.
+
+    The cProfile stats are written to a file in the config directory. Return the
+    path of the file, the top functions by cumulative time and the timings of the
+    polling and command phases of each account while profiling. A poll cycle ends
+    once every account polled, whether the polls succeeded or not.
+    """
+    finished: asyncio.Future[None] = hass.loop.create_future()
+    polls = {coordinator: coordinator.telemetry.polls for coordinator in coordinators}
+
+    @callback
+    def _async_poll_cycle() -> None:
+        """Finish once every account polled the number of cycles."""
+        if not finished.done() and all(
+            coordinator.telemetry.polls - start_polls >= cycles
+            for coordinator, start_polls in polls.items()
+        ):
+            finished.set_result(None)
+
+    unsubs = [
+        coordinator.async_add_poll_listener(_async_poll_cycle)
+        for coordinator in coordinators
+    ] if cycles else []
+    marks = {coordinator: coordinator.telemetry.mark() for coordinator in coordinators}
+
+    LOGGER.info("Profiling Sunsa for up to %s seconds", duration)
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as error:
+        # Another profiler, e.g. that of the profiler integration, is running
+        for unsub in unsubs:
+            unsub()
+        raise HomeAssistantError(f"Unable to start profiling: {error}") from error
+    start = monotonic()
+    try:
+        await asyncio.wait_for(asyncio.shield(finished), duration)
+    except TimeoutError:
+        pass
+    finally:
+        profiler.disable()
+        for unsub in unsubs:
+            unsub()
+    elapsed = monotonic() - start
+
+    path = hass.config.path(f"{DOMAIN}_profile_{strftime('%Y%m%d_%H%M%S')}")
+    top_functions = await hass.async_add_executor_job(_write_profile, profiler, path)
+    LOGGER.info("Sunsa profile written to %s.prof and %s.txt", path, path)
+    return {
+        "path": f"{path}.prof",
+        "summary_path": f"{path}.txt",
+        "elapsed": round(elapsed, 3),
+        "phases": {
+            coordinator.config_entry.title: {
+                **coordinator.telemetry.as_dict(mark),
+                # Only the polls while profiling
+                "polls": coordinator.telemetry.polls - polls[coordinator],
+            }
+            for coordinator, mark in marks.items()
+        },
+        "top_functions": top_functions,
+    }
+
+
+def _write_profile(profiler: cProfile.Profile, path: str) -> list[dict[str, Any]]:
+    """Write the profile and its summary to files and return its top functions."""
+    profiler.dump_stats(f"{path}.prof")
+    with open(f"{path}.txt", "w", encoding="utf-8") as summary:
+        stats = pstats.Stats(profiler, stream=summary)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_TOP_FUNCTIONS)
+    top_functions = []
+    for function in stats.fcn_list[:PROFILE_TOP_FUNCTIONS]:
+        _, calls, total_time, cumulative_time, _ = stats.stats[function]
+        file_name, line, name = function
+        top_functions.append({
+            "function": f"{file_name}:{line}({name})",
+            "calls": calls,
+            "total_time": round(total_time, 6),
+            "cumulative_time": round(cumulative_time, 6),
+        })
+    return top_functions
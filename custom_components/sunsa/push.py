@@ -0,0 +1,79 @@
+"""Webhook receiving the device states pushed by the Sunsa cloud."""
+
+
+from __future__ import annotations
+
+from http import HTTPStatus
+from json import JSONDecodeError
+
+from aiohttp import web
+
+from homeassistant.components import webhook
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_WEBHOOK_ID
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from .const import DOMAIN, LOGGER
+from .coordinator import SunsaDataUpdateCoordinator
+
+
+@callback
+def async_register_webhook(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    coordinator: SunsaDataUpdateCoordinator
+) -> CALLBACK_TYPE:
+    """Register the webhook of a config entry and return its unregister callback.
+
+    The webhook accepts a list of device payloads, or an object with them under
+    "devices", in the shape returned by the Sunsa API.
+    """
+    if CONF_WEBHOOK_ID not in entry.data:
+        hass.config_entries.async_update_entry(
+            entry,
+            data={**entry.data, CONF_WEBHOOK_ID: webhook.async_generate_id()}
+        )
+    webhook_id = entry.data[CONF_WEBHOOK_ID]
+
+    async def async_handle_webhook(
+        hass: HomeAssistant,
+        webhook_id: str,
+        request: web.Request
+    ) -> web.Response:
+        """Merge the pushed device states."""
+        try:
+            payload = await request.json()
+        except (JSONDecodeError, UnicodeDecodeError):
+            return web.Response(status=HTTPStatus.BAD_REQUEST)
+
+        devices = payload.get("devices") if isinstance(payload, dict) else payload
+        if not isinstance(devices, list):
+            return web.Response(status=HTTPStatus.BAD_REQUEST)
+        try:
+            coordinator.async_handle_push(devices)
+        except UpdateFailed as error:
+            LOGGER.debug("Ignoring pushed device states: %s", error)
+            return web.Response(status=HTTPStatus.BAD_REQUEST)
+        return web.Response(status=HTTPStatus.OK)
+
+    webhook.async_register(
+        hass,
+        DOMAIN,
+        entry.title,
+        webhook_id,
+        async_handle_webhook,
+        allowed_methods=["POST"],
+    )
+    LOGGER.debug(
+        "Sunsa device states of %s can be pushed to %s",
+        entry.title,
+        webhook.async_generate_path(webhook_id)
+    )
+
+    @callback
+    def unregister() -> None:
+        """Unregister the webhook."""
+        webhook.async_unregister(hass, webhook_id)
+
+    return unregister
@@ -5,8 +5,10 @@
 
 from __future__ import annotations
 
-from collections.abc import Callable
+from collections.abc import Callable, Iterable
 from dataclasses import dataclass
+from datetime import datetime, timedelta
+from time import monotonic
 
 from homeassistant.components.sensor import (
     SensorDeviceClass,
@@ -16,34 +18,54 @@ from homeassistant.components.sensor import (
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
-    UnitOfTemperature, EntityCategory, CONF_NAME, PERCENTAGE, ATTR_TEMPERATURE,
+    UnitOfTemperature, UnitOfTime, EntityCategory, PERCENTAGE, ATTR_TEMPERATURE,
     ATTR_BATTERY_LEVEL
 )
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.typing import StateType
 
-from .const import DOMAIN, VALUE, TEXT, DEFAULT_SMART_HOME_DIRECTION, LOGGER, BLIND_TYPE
+from .const import (
+    DOMAIN, DEFAULT_SMART_HOME_DIRECTION, LOGGER, BLIND_TYPE, BATTERY_PERCENTAGE
+)
 from .coordinator import SunsaDataUpdateCoordinator
-from .entity import SunsaEntity
+from .entity import SunsaAccountEntity, SunsaEntity
+from .governor import CircuitState
+from .history import WandHistory
+from .models import SunsaDevice
 
 
 @dataclass(frozen=True)
 class SunsaSensorEntityDescription(SensorEntityDescription):
-    """Sunsa sensor description."""
+    """Sunsa sensor description.
+
+    Numeric changes smaller than the deadband are not written, nor any change
+    sooner than the minimum write interval after the previous write. A change is
+    always written once the heartbeat has elapsed since the previous write.
+    """
 
     round_state_value: bool = False
-    state_fn: Callable[[StateType]] | None = None
+    value_fn: Callable[[SunsaDevice], StateType] | None = None
+    # Whether the device reports the value, the sensor is only created if so
+    exists_fn: Callable[[SunsaDevice], bool] = lambda device: True
+    deadband: float = 0
+    min_write_interval: timedelta | None = None
+    heartbeat: timedelta | None = None
 
 
 # https://developers.home-assistant.io/docs/core/entity/#generic-properties
 # noinspection PyArgumentList
 SENSORS: tuple[SunsaSensorEntityDescription, ...] = (
     SunsaSensorEntityDescription(
-        key="batteryPercentage",
+        key=BATTERY_PERCENTAGE,
         device_class=SensorDeviceClass.BATTERY,
         native_unit_of_measurement=PERCENTAGE,
         state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda device: device.battery_percentage,
+        exists_fn=lambda device: device.battery_percentage is not None,
+        deadband=2,
+        heartbeat=timedelta(hours=6)
     ),
     SunsaSensorEntityDescription(
         key=ATTR_TEMPERATURE,
@@ -51,23 +73,168 @@ SENSORS: tuple[SunsaSensorEntityDescription, ...] = (
         native_unit_of_measurement=UnitOfTemperature.FAHRENHEIT,
         state_class=SensorStateClass.MEASUREMENT,
         suggested_display_precision=0,
-        state_fn=lambda data: data.get(VALUE)
+        value_fn=lambda device: device.temperature,
+        exists_fn=lambda device: device.temperature is not None,
+        deadband=0.5,
+        min_write_interval=timedelta(minutes=5),
+        heartbeat=timedelta(hours=1)
     ),
     SunsaSensorEntityDescription(
         key=DEFAULT_SMART_HOME_DIRECTION,
         translation_key="default_smart_home_direction",
         entity_category=EntityCategory.DIAGNOSTIC,
-        state_fn=lambda data: data[TEXT].lower()
+        value_fn=lambda device: device.default_smart_home_direction
     ),
     SunsaSensorEntityDescription(
         key=BLIND_TYPE,
         translation_key="blind_type",
         entity_category=EntityCategory.DIAGNOSTIC,
-        state_fn=lambda data: data[TEXT].lower()
+        value_fn=lambda device: device.blind_type
+    ),
+)
+
+
+@dataclass(frozen=True)
+class SunsaHistorySensorEntityDescription(SensorEntityDescription):
+    """Sunsa sensor description of a value derived from the wand history."""
+
+    value_fn: Callable[[WandHistory, SunsaDevice], StateType] | None = None
+    exists_fn: Callable[[SunsaDevice], bool] = lambda device: True
+
+
+# noinspection PyArgumentList
+HISTORY_SENSORS: tuple[SunsaHistorySensorEntityDescription, ...] = (
+    SunsaHistorySensorEntityDescription(
+        key="battery_drain_rate",
+        translation_key="battery_drain_rate",
+        native_unit_of_measurement=f"{PERCENTAGE}/{UnitOfTime.DAYS}",
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=1,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda history, device: history.drain_rate,
+        exists_fn=lambda device: device.battery_percentage is not None
+    ),
+    SunsaHistorySensorEntityDescription(
+        key="battery_days_to_empty",
+        translation_key="battery_days_to_empty",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.DAYS,
+        suggested_display_precision=0,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda history, device: history.days_to_empty(
+            device.battery_percentage
+        ),
+        exists_fn=lambda device: device.battery_percentage is not None
+    ),
+)
+
+
+@dataclass(frozen=True)
+class SunsaAccountSensorEntityDescription(SensorEntityDescription):
+    """Sunsa account sensor description.
+
+    Only changed values are written, and no sooner than the minimum write interval
+    after the previous write.
+    """
+
+    value_fn: Callable[[SunsaDataUpdateCoordinator], StateType] | None = None
+    min_write_interval: timedelta | None = None
+
+
+# noinspection PyArgumentList
+ACCOUNT_SENSORS: tuple[SunsaAccountSensorEntityDescription, ...] = (
+    SunsaAccountSensorEntityDescription(
+        key="polling_interval",
+        translation_key="polling_interval",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.SECONDS,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda coordinator: coordinator.update_interval.total_seconds()
+    ),
+    SunsaAccountSensorEntityDescription(
+        key="commands_coalesced",
+        translation_key="commands_coalesced",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda coordinator: coordinator.dispatcher.commands_coalesced
+    ),
+    SunsaAccountSensorEntityDescription(
+        key="requests_queued",
+        translation_key="requests_queued",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda coordinator: coordinator.governor.requests_queued
+    ),
+    SunsaAccountSensorEntityDescription(
+        key="requests_delayed",
+        translation_key="requests_delayed",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda coordinator: coordinator.governor.requests_delayed
+    ),
+    SunsaAccountSensorEntityDescription(
+        key="requests_dropped",
+        translation_key="requests_dropped",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda coordinator: coordinator.governor.requests_dropped
+    ),
+    SunsaAccountSensorEntityDescription(
+        key="circuit_state",
+        translation_key="circuit_state",
+        device_class=SensorDeviceClass.ENUM,
+        options=[state.value for state in CircuitState],
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda coordinator: coordinator.governor.circuit_breaker.state
+    ),
+    SunsaAccountSensorEntityDescription(
+        key="poll_latency",
+        translation_key="poll_latency",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        suggested_display_precision=0,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda coordinator: _milliseconds(
+            coordinator.telemetry.poll_latency.percentile(95)
+        ),
+        min_write_interval=timedelta(minutes=5)
+    ),
+    SunsaAccountSensorEntityDescription(
+        key="command_latency",
+        translation_key="command_latency",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        suggested_display_precision=0,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda coordinator: _milliseconds(
+            coordinator.telemetry.command_latency.percentile(95)
+        ),
+        min_write_interval=timedelta(minutes=5)
+    ),
+    SunsaAccountSensorEntityDescription(
+        key="poll_errors",
+        translation_key="poll_errors",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda coordinator: coordinator.telemetry.poll_errors
+        + coordinator.telemetry.poll_timeouts
+    ),
+    SunsaAccountSensorEntityDescription(
+        key="command_errors",
+        translation_key="command_errors",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        value_fn=lambda coordinator: coordinator.telemetry.command_errors
+        + coordinator.telemetry.command_timeouts
     ),
 )
 
 
+def _milliseconds(seconds: float | None) -> float | None:
+    """Convert a duration from seconds to milliseconds."""
+    return None if seconds is None else seconds * 1000
+
+
 async def async_setup_entry(
     hass: HomeAssistant,
     config_entry: ConfigEntry,
@@ -75,13 +242,47 @@ async def async_setup_entry(
 ) -> None:
     """Set up the Sunsa sensors."""
     coordinator: SunsaDataUpdateCoordinator = hass.data[DOMAIN][config_entry.entry_id]
-    sensors = [
-        SunsaSensor(coordinator, sunsa_device_id, description)
-        for sunsa_device_id in coordinator.data
-        for description in SENSORS
-    ]
-    async_add_entities(sensors)
-    LOGGER.debug("Registered %s sensors", len(sensors))
+
+    # Keys of the sensors created for each device
+    added: dict[int, set[str]] = {}
+
+    @callback
+    def _async_add_sensors(sunsa_device_ids: Iterable[int]) -> None:
+        """Add the sensors of the values reported by the given devices."""
+        sensors = []
+        for sunsa_device_id in sunsa_device_ids:
+            if (device := coordinator.data.get(sunsa_device_id)) is None:
+                added.pop(sunsa_device_id, None)
+                continue
+            keys = added.setdefault(sunsa_device_id, set())
+            for descriptions, sensor_class in (
+                (SENSORS, SunsaSensor),
+                (HISTORY_SENSORS, SunsaHistorySensor),
+            ):
+                for description in descriptions:
+                    if description.key not in keys and description.exists_fn(device):
+                        keys.add(description.key)
+                        sensors.append(
+                            sensor_class(coordinator, sunsa_device_id, description)
+                        )
+        if sensors:
+            async_add_entities(sensors)
+            LOGGER.debug("Registered %s sensors", len(sensors))
+
+    @callback
+    def _async_add_reported_sensors() -> None:
+        """Add the sensors of new devices and of values devices started to report."""
+        if coordinator.last_update_success:
+            _async_add_sensors(coordinator.changed_device_ids)
+
+    _async_add_sensors(coordinator.data)
+    config_entry.async_on_unload(
+        coordinator.async_add_listener(_async_add_reported_sensors)
+    )
+    async_add_entities(
+        SunsaAccountSensor(coordinator, description)
+        for description in ACCOUNT_SENSORS
+    )
 
 
 class SunsaSensor(SunsaEntity, SensorEntity):
@@ -96,7 +297,7 @@ class SunsaSensor(SunsaEntity, SensorEntity):
         sensor_description: SunsaSensorEntityDescription,
     ) -> None:
         """Initialize the sensor entity."""
-        device_name = coordinator.data[sunsa_device_id][CONF_NAME]
+        device_name = coordinator.data[sunsa_device_id].name
         super().__init__(
             coordinator,
             device_name,
@@ -104,18 +305,173 @@ class SunsaSensor(SunsaEntity, SensorEntity):
             sensor_description.key
         )
         self.entity_description = sensor_description
+        # Only changed devices trigger an update, so start from the current data
+        self._update_native_value()
+        self._last_write = monotonic()
+        self._last_write_available = True
+        self._unsub_deferred_write: Callable[[], None] | None = None
 
     @callback
     def _handle_coordinator_update(self) -> None:
-        """Handle updated data from the coordinator."""
+        """Write the updated data from the coordinator if significant."""
+        if self._unsub_deferred_write is not None:
+            self._unsub_deferred_write()
+            self._unsub_deferred_write = None
+
+        if self.available == self._last_write_available and self.device is not None:
+            value = self.entity_description.value_fn(self.device)
+            elapsed = monotonic() - self._last_write
+            if self._within_deadband(value, elapsed):
+                return
+            min_write_interval = self.entity_description.min_write_interval
+            if min_write_interval is not None \
+                    and elapsed < min_write_interval.total_seconds():
+                # Write the latest value once the interval ends
+                self._unsub_deferred_write = async_call_later(
+                    self.hass,
+                    min_write_interval.total_seconds() - elapsed,
+                    self._async_deferred_write
+                )
+                return
+
+        self._async_write_native_value()
+
+    def _within_deadband(self, value: StateType, elapsed: float) -> bool:
+        """Return true if the value is not a significant change to write."""
+        heartbeat = self.entity_description.heartbeat
+        if heartbeat is not None and elapsed >= heartbeat.total_seconds():
+            return False
+        if value == self._attr_native_value:
+            return True
+        return (isinstance(value, int | float)
+                and isinstance(self._attr_native_value, int | float)
+                and abs(value - self._attr_native_value)
+                < self.entity_description.deadband)
+
+    @callback
+    def _async_deferred_write(self, _now: datetime) -> None:
+        """Write the value held back by the minimum write interval."""
+        self._unsub_deferred_write = None
+        self._async_write_native_value()
+
+    @callback
+    def _async_write_native_value(self) -> None:
+        """Write the sensor value from the device data."""
+        self._update_native_value()
+        self._last_write = monotonic()
+        self._last_write_available = self.available
+        self.async_write_ha_state()
+
+    def _update_native_value(self) -> None:
+        """Set the sensor value from the device data."""
         if self.device is not None:
-            data = self.device.get(self.entity_description.key)
+            self._attr_native_value = self.entity_description.value_fn(self.device)
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Cancel the deferred write when the entity is removed."""
+        await super().async_will_remove_from_hass()
+        if self._unsub_deferred_write is not None:
+            self._unsub_deferred_write()
+            self._unsub_deferred_write = None
+
 
-            if self.entity_description.state_fn is not None:
-                value = self.entity_description.state_fn(data)
-            else:
-                value = data
+class SunsaHistorySensor(SunsaEntity, SensorEntity):
+    """Representation of a Sunsa sensor derived from the wand history."""
 
-            self._attr_native_value = value
+    entity_description: SunsaHistorySensorEntityDescription
 
+    def __init__(
+        self,
+        coordinator: SunsaDataUpdateCoordinator,
+        sunsa_device_id: int,
+        sensor_description: SunsaHistorySensorEntityDescription,
+    ) -> None:
+        """Initialize the history sensor entity."""
+        device_name = coordinator.data[sunsa_device_id].name
+        super().__init__(
+            coordinator,
+            device_name,
+            sunsa_device_id,
+            sensor_description.key
+        )
+        self.entity_description = sensor_description
+
+    async def async_added_to_hass(self) -> None:
+        """Also update the sensor on each sample, the device data may not change."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.history.async_add_listener(self.async_write_ha_state)
+        )
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the state of the sensor."""
+        history = self.coordinator.history.wands.get(self._sunsa_device_id)
+        if history is None or self.device is None:
+            return None
+        return self.entity_description.value_fn(history, self.device)
+
+
+class SunsaAccountSensor(SunsaAccountEntity, SensorEntity):
+    """Representation of a Sunsa account diagnostic sensor."""
+
+    entity_description: SunsaAccountSensorEntityDescription
+
+    def __init__(
+        self,
+        coordinator: SunsaDataUpdateCoordinator,
+        sensor_description: SunsaAccountSensorEntityDescription,
+    ) -> None:
+        """Initialize the account sensor entity."""
+        super().__init__(coordinator, sensor_description.key)
+        self.entity_description = sensor_description
+        self._attr_native_value = sensor_description.value_fn(coordinator)
+        self._last_write = monotonic()
+        self._last_write_available = True
+        self._unsub_deferred_write: Callable[[], None] | None = None
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the account data from the coordinator if it changed."""
+        if self.available == self._last_write_available:
+            if (self.entity_description.value_fn(self.coordinator)
+                    == self._attr_native_value
+                    or self._unsub_deferred_write is not None):
+                return
+            min_write_interval = self.entity_description.min_write_interval
+            elapsed = monotonic() - self._last_write
+            if min_write_interval is not None \
+                    and elapsed < min_write_interval.total_seconds():
+                # Write the latest value once the interval ends
+                self._unsub_deferred_write = async_call_later(
+                    self.hass,
+                    min_write_interval.total_seconds() - elapsed,
+                    self._async_deferred_write
+                )
+                return
+
+        self._async_write_native_value()
+
+    @callback
+    def _async_deferred_write(self, _now: datetime) -> None:
+        """Write the value held back by the minimum write interval."""
+        self._unsub_deferred_write = None
+        self._async_write_native_value()
+
+    @callback
+    def _async_write_native_value(self) -> None:
+        """Write the sensor value from the account data."""
+        if self._unsub_deferred_write is not None:
+            self._unsub_deferred_write()
+            self._unsub_deferred_write = None
+        self._attr_native_value = self.entity_description.value_fn(self.coordinator)
+        self._last_write = monotonic()
+        self._last_write_available = self.available
         self.async_write_ha_state()
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Cancel the deferred write when the entity is removed."""
+        await super().async_will_remove_from_hass()
+        if self._unsub_deferred_write is not None:
+            self._unsub_deferred_write()
+            self._unsub_deferred_write = None
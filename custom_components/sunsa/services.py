@@ -0,0 +1,369 @@
+
+
+"""Services for the Sunsa integration."""
+
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.const import ATTR_DEVICE_ID, ATTR_ENTITY_ID, CONF_NAME
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+import homeassistant.helpers.device_registry as dr
+import homeassistant.helpers.entity_registry as er
+from homeassistant.helpers.service import async_extract_entity_ids
+
+from .const import (
+    ATTR_POSITION,
+    ATTR_TARGETS,
+    ATTR_WINDOW_AZIMUTH,
+    ATTR_DURATION,
+    ATTR_CYCLES,
+    ATTR_TOLERANCE,
+    DOMAIN,
+    DEFAULT_PROFILE_DURATION,
+    DEFAULT_PRESET_TOLERANCE,
+    MAX_PROFILE_DURATION,
+    SERVICE_SET_ABSOLUTE_POSITIONS,
+    SERVICE_SET_WINDOW_AZIMUTH,
+    SERVICE_SAVE_PRESET,
+    SERVICE_APPLY_PRESET,
+    SERVICE_DELETE_PRESET,
+    SERVICE_PROFILE,
+)
+from .coordinator import SunsaDataUpdateCoordinator
+from .dispatcher import SunsaCommandResult
+from .profiler import async_profile
+
+TARGET_SCHEMA = vol.All(
+    {
+        vol.Exclusive(ATTR_ENTITY_ID, "target"): cv.entity_id,
+        vol.Exclusive(ATTR_DEVICE_ID, "target"): cv.string,
+        vol.Required(ATTR_POSITION): vol.All(
+            vol.Coerce(int),
+            vol.Range(min=-100, max=100)
+        ),
+    },
+    cv.has_at_least_one_key(ATTR_ENTITY_ID, ATTR_DEVICE_ID),
+)
+
+SERVICE_SET_POSITIONS_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_TARGETS): vol.All(
+            cv.ensure_list,
+            vol.Length(min=1),
+            [TARGET_SCHEMA]
+        ),
+    }
+)
+
+SERVICE_SAVE_PRESET_SCHEMA = SERVICE_SET_POSITIONS_SCHEMA.extend(
+    {
+        vol.Required(CONF_NAME): cv.string,
+    }
+)
+
+SERVICE_APPLY_PRESET_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_NAME): cv.string,
+        vol.Optional(ATTR_TOLERANCE, default=DEFAULT_PRESET_TOLERANCE): vol.All(
+            vol.Coerce(int),
+            vol.Range(min=0, max=200)
+        ),
+    }
+)
+
+SERVICE_DELETE_PRESET_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_NAME): cv.string,
+    }
+)
+
+SERVICE_SET_WINDOW_AZIMUTH_SCHEMA = cv.make_entity_service_schema(
+    {
+        vol.Optional(ATTR_WINDOW_AZIMUTH): vol.All(
+            vol.Coerce(float),
+            vol.Range(min=0, max=360)
+        ),
+    }
+)
+
+SERVICE_PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_DURATION, default=DEFAULT_PROFILE_DURATION): vol.All(
+            vol.Coerce(float),
+            vol.Range(min=1, max=MAX_PROFILE_DURATION)
+        ),
+        vol.Optional(ATTR_CYCLES): vol.All(vol.Coerce(int), vol.Range(min=1)),
+    }
+)
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Set up the services for the Sunsa integration."""
+
+    def resolve_cover(
+        entity_id: str
+    ) -> tuple[SunsaDataUpdateCoordinator | None, int]:
+        """Return the coordinator and the Sunsa device id of a cover."""
+        entity = er.async_get(hass).async_get(entity_id)
+        if entity is None or entity.platform != DOMAIN or entity.domain != "cover":
+            raise HomeAssistantError(f"{entity_id} is not a Sunsa cover")
+        # The unique id of a cover is the Sunsa device id
+        return hass.data.get(DOMAIN, {}).get(entity.config_entry_id), int(
+            entity.unique_id
+        )
+
+    def resolve_targets(
+        targets: list[dict[str, Any]],
+    ) -> dict[SunsaDataUpdateCoordinator, dict[int, int]]:
+        """Return the positions to send to the devices of each account."""
+        device_registry = dr.async_get(hass)
+        coordinators: dict[str, SunsaDataUpdateCoordinator] = hass.data.get(DOMAIN, {})
+        # Device ids by name for each account, built on first use
+        device_ids_by_name: dict[SunsaDataUpdateCoordinator, dict[str, int]] = {}
+        positions: dict[SunsaDataUpdateCoordinator, dict[int, int]] = {}
+
+        for target in targets:
+            if ATTR_ENTITY_ID in target:
+                coordinator, sunsa_device_id = resolve_cover(target[ATTR_ENTITY_ID])
+            else:
+                device = device_registry.async_get(target[ATTR_DEVICE_ID])
+                device_name = next(
+                    (
+                        identifier
+                        for domain, identifier in (device.identifiers if device else ())
+                        if domain == DOMAIN
+                    ),
+                    None
+                )
+                if device_name is None:
+                    raise HomeAssistantError(
+                        f"Device '{target[ATTR_DEVICE_ID]}' is not a Sunsa wand"
+                    )
+                coordinator = next(
+                    (
+                        coordinators[entry_id]
+                        for entry_id in device.config_entries
+                        if entry_id in coordinators
+                    ),
+                    None
+                )
+                sunsa_device_id = None
+                if coordinator is not None:
+                    if coordinator not in device_ids_by_name:
+                        device_ids_by_name[coordinator] = {
+                            sunsa_device.name: sunsa_device.id
+                            for sunsa_device in coordinator.data.values()
+                        }
+                    sunsa_device_id = device_ids_by_name[coordinator].get(device_name)
+
+            if (coordinator is None
+                    or coordinator.data is None
+                    or sunsa_device_id not in coordinator.data):
+                raise HomeAssistantError(
+                    f"Sunsa wand of target {target} is not loaded"
+                )
+            positions.setdefault(coordinator, {})[sunsa_device_id] = (
+                target[ATTR_POSITION]
+            )
+
+        return positions
+
+    def account_coordinators() -> list[SunsaDataUpdateCoordinator]:
+        """Return the coordinator of each loaded account."""
+        coordinators: dict[str, SunsaDataUpdateCoordinator] = hass.data.get(DOMAIN, {})
+        # Entries of the same account share their coordinator
+        return list(dict.fromkeys(coordinators.values()))
+
+    async def async_move(
+        call: ServiceCall,
+        positions: dict[SunsaDataUpdateCoordinator, dict[int, int]],
+    ) -> ServiceResponse:
+        """Send the positions and report the result of each command."""
+        # Named before sending, a poll or a push may retire wands meanwhile
+        names = {
+            (coordinator, sunsa_device_id): coordinator.data[sunsa_device_id].name
+            for coordinator, targets in positions.items()
+            for sunsa_device_id in targets
+        }
+        # Each account sends its commands concurrently through its dispatcher
+        account_results: list[dict[int, SunsaCommandResult]] = await asyncio.gather(
+            *(
+                coordinator.dispatcher.async_move_many(targets)
+                for coordinator, targets in positions.items()
+            )
+        )
+
+        results = [
+            {
+                CONF_NAME: names[coordinator, sunsa_device_id],
+                ATTR_POSITION: result.position,
+                "success": result.success,
+                "elapsed": round(result.elapsed, 3),
+                "error": result.error,
+                "queued": result.queued,
+            }
+            for coordinator, results_by_id in zip(positions, account_results)
+            for sunsa_device_id, result in results_by_id.items()
+        ]
+        failed = [result[CONF_NAME] for result in results if not result["success"]]
+        queued = [result[CONF_NAME] for result in results if result["queued"]]
+
+        if not call.return_response:
+            if lost := [name for name in failed if name not in queued]:
+                raise HomeAssistantError(
+                    f"Unable to reposition {', '.join(lost)}"
+                )
+            return None
+        return {
+            "succeeded": len(results) - len(failed),
+            "failed": len(failed),
+            "queued": len(queued),
+            "results": results,
+        }
+
+    async def async_set_positions(call: ServiceCall) -> ServiceResponse:
+        """Move several Sunsa blinds, each to its own absolute position."""
+        return await async_move(call, resolve_targets(call.data[ATTR_TARGETS]))
+
+    async def async_save_preset(call: ServiceCall) -> None:
+        """Store the positions of Sunsa blinds as a named preset."""
+        positions = resolve_targets(call.data[ATTR_TARGETS])
+        for coordinator in account_coordinators():
+            # Presets are stored by account, the accounts left out don't keep theirs
+            if coordinator in positions:
+                coordinator.presets.async_save_preset(
+                    call.data[CONF_NAME], positions[coordinator]
+                )
+            else:
+                coordinator.presets.async_delete_preset(call.data[CONF_NAME])
+
+    async def async_apply_preset(call: ServiceCall) -> ServiceResponse:
+        """Move the Sunsa blinds of a preset that are not at its positions yet."""
+        name = call.data[CONF_NAME]
+        coordinators = [
+            coordinator
+            for coordinator in account_coordinators()
+            if name in coordinator.presets.presets
+        ]
+        if not coordinators:
+            raise HomeAssistantError(f"Unknown Sunsa preset '{name}'")
+
+        positions: dict[SunsaDataUpdateCoordinator, dict[int, int]] = {}
+        skipped = 0
+        for coordinator in coordinators:
+            targets, skipped_moves = coordinator.presets.moves(
+                name,
+                coordinator.data,
+                coordinator.pending_targets,
+                call.data[ATTR_TOLERANCE]
+            )
+            skipped += skipped_moves
+            if targets:
+                positions[coordinator] = targets
+
+        response = await async_move(call, positions)
+        if response is not None:
+            response["skipped"] = skipped
+        return response
+
+    async def async_delete_preset(call: ServiceCall) -> None:
+        """Delete a named preset of Sunsa blinds."""
+        deleted = [
+            coordinator.presets.async_delete_preset(call.data[CONF_NAME])
+            for coordinator in account_coordinators()
+        ]
+        if not any(deleted):
+            raise HomeAssistantError(f"Unknown Sunsa preset '{call.data[CONF_NAME]}'")
+
+    async def async_set_window_azimuth(call: ServiceCall) -> None:
+        """Track the sun for Sunsa blinds, or stop if no azimuth is given."""
+        entity_registry = er.async_get(hass)
+        # Targeted areas and devices may have entities of other integrations
+        entity_ids = [
+            entity_id
+            for entity_id in await async_extract_entity_ids(hass, call)
+            if (entity := entity_registry.async_get(entity_id)) is not None
+            and entity.platform == DOMAIN
+            and entity.domain == "cover"
+        ]
+        if not entity_ids:
+            raise HomeAssistantError("No Sunsa cover was targeted")
+        for entity_id in entity_ids:
+            coordinator, sunsa_device_id = resolve_cover(entity_id)
+            if coordinator is None:
+                raise HomeAssistantError(f"{entity_id} is not loaded")
+            coordinator.sun_tracker.async_set_window_azimuth(
+                sunsa_device_id,
+                call.data.get(ATTR_WINDOW_AZIMUTH)
+            )
+
+    profiling = asyncio.Lock()
+
+    async def async_profile_integration(call: ServiceCall) -> ServiceResponse:
+        """Profile the Sunsa integration for a while."""
+        if profiling.locked():
+            raise HomeAssistantError("Sunsa is already being profiled")
+        async with profiling:
+            return await async_profile(
+                hass,
+                account_coordinators(),
+                call.data[ATTR_DURATION],
+                call.data.get(ATTR_CYCLES)
+            )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PROFILE,
+        async_profile_integration,
+        schema=SERVICE_PROFILE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SAVE_PRESET,
+        async_save_preset,
+        schema=SERVICE_SAVE_PRESET_SCHEMA,
+    )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_APPLY_PRESET,
+        async_apply_preset,
+        schema=SERVICE_APPLY_PRESET_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_DELETE_PRESET,
+        async_delete_preset,
+        schema=SERVICE_DELETE_PRESET_SCHEMA,
+    )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SET_WINDOW_AZIMUTH,
+        async_set_window_azimuth,
+        schema=SERVICE_SET_WINDOW_AZIMUTH_SCHEMA,
+    )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SET_ABSOLUTE_POSITIONS,
+        async_set_positions,
+        schema=SERVICE_SET_POSITIONS_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
@@ -0,0 +1,182 @@
+
+
+"""HTTP session dedicated to the Sunsa API requests of an account."""
+
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from types import SimpleNamespace
+from typing import Any
+
+import aiohttp
+
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant
+from homeassistant.helpers.aiohttp_client import (
+    ENABLE_CLEANUP_CLOSED,
+    SERVER_SOFTWARE,
+)
+from homeassistant.util import ssl as ssl_util
+
+from .const import (
+    LOGGER,
+    SESSION_CONNECTION_LIMIT,
+    SESSION_DNS_CACHE_TTL,
+    SESSION_KEEPALIVE_TIMEOUT,
+)
+
+
+class SunsaSessionStats:
+    """Connection and DNS cache usage of a Sunsa HTTP session."""
+
+    def __init__(self) -> None:
+        """Initialize the counters."""
+        self.requests = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.dns_cache_hits = 0
+        self.dns_cache_misses = 0
+        # Responses whose Retry-After header deferred the requests
+        self.retry_afters = 0
+        # Decoded size in bytes of the response bodies read
+        self.responses_read = 0
+        self.bytes_received = 0
+        self.last_response_size = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the counters."""
+        return {
+            "requests": self.requests,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "dns_cache_hits": self.dns_cache_hits,
+            "dns_cache_misses": self.dns_cache_misses,
+            "retry_afters": self.retry_afters,
+            "bytes_received": self.bytes_received,
+        }
+
+
+class SunsaSession:
+    """Keep-alive HTTP session with its own connection pool and DNS cache.
+
+    Sunsa requests don't compete with other integrations for the connections of
+    the session shared by Home Assistant, and consecutive requests reuse the same
+    TLS connection. Compressed responses are negotiated and decoded by aiohttp.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        on_retry_after: Callable[[float], None]
+    ) -> None:
+        """Initialize the session."""
+        self.stats = SunsaSessionStats()
+        self._on_retry_after = on_retry_after
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_end.append(self._on_request_end)
+        trace_config.on_response_chunk_received.append(self._on_response_received)
+        trace_config.on_connection_create_end.append(self._on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuseconn)
+        trace_config.on_dns_cache_hit.append(self._on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(self._on_dns_cache_miss)
+
+        self.client_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=SESSION_CONNECTION_LIMIT,
+                limit_per_host=SESSION_CONNECTION_LIMIT,
+                keepalive_timeout=SESSION_KEEPALIVE_TIMEOUT,
+                use_dns_cache=True,
+                ttl_dns_cache=SESSION_DNS_CACHE_TTL,
+                enable_cleanup_closed=ENABLE_CLEANUP_CLOSED,
+                ssl=ssl_util.get_default_context(),
+            ),
+            headers={
+                aiohttp.hdrs.USER_AGENT: SERVER_SOFTWARE,
+                aiohttp.hdrs.ACCEPT_ENCODING: "gzip, deflate",
+            },
+            trace_configs=[trace_config],
+        )
+        self._unsub_close: CALLBACK_TYPE | None = hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_CLOSE, self._async_close_on_stop
+        )
+
+    async def async_close(self) -> None:
+        """Close the connections of the session."""
+        if self._unsub_close is not None:
+            self._unsub_close()
+            self._unsub_close = None
+        await self.client_session.close()
+
+    async def _async_close_on_stop(self, event: Event) -> None:
+        """Close the session when Home Assistant stops."""
+        self._unsub_close = None
+        await self.client_session.close()
+
+    async def _on_request_end(
+        self,
+        session: aiohttp.ClientSession,
+        context: SimpleNamespace,
+        params: aiohttp.TraceRequestEndParams
+    ) -> None:
+        """Count the request and honor the Retry-After header of the response."""
+        self.stats.requests += 1
+        retry_after = params.response.headers.get(aiohttp.hdrs.RETRY_AFTER)
+        if retry_after is None or params.response.status not in (429, 503):
+            return
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            # HTTP dates are not used by the Sunsa API
+            LOGGER.debug("Ignoring Retry-After header: %s", retry_after)
+            return
+        self.stats.retry_afters += 1
+        self._on_retry_after(delay)
+
+    async def _on_response_received(
+        self,
+        session: aiohttp.ClientSession,
+        context: SimpleNamespace,
+        params: aiohttp.TraceResponseChunkReceivedParams
+    ) -> None:
+        """Measure a response body, sent whole once read by aiohttp."""
+        self.stats.responses_read += 1
+        self.stats.bytes_received += len(params.chunk)
+        self.stats.last_response_size = len(params.chunk)
+
+    async def _on_connection_create_end(
+        self,
+        session: aiohttp.ClientSession,
+        context: SimpleNamespace,
+        params: aiohttp.TraceConnectionCreateEndParams
+    ) -> None:
+        """Count a new connection."""
+        self.stats.connections_created += 1
+
+    async def _on_connection_reuseconn(
+        self,
+        session: aiohttp.ClientSession,
+        context: SimpleNamespace,
+        params: aiohttp.TraceConnectionReuseconnParams
+    ) -> None:
+        """Count a request sent on a pooled connection."""
+        self.stats.connections_reused += 1
+
+    async def _on_dns_cache_hit(
+        self,
+        session: aiohttp.ClientSession,
+        context: SimpleNamespace,
+        params: aiohttp.TraceDnsCacheHitParams
+    ) -> None:
+        """Count a host resolved from the DNS cache."""
+        self.stats.dns_cache_hits += 1
+
+    async def _on_dns_cache_miss(
+        self,
+        session: aiohttp.ClientSession,
+        context: SimpleNamespace,
+        params: aiohttp.TraceDnsCacheMissParams
+    ) -> None:
+        """Count a host that had to be resolved."""
+        self.stats.dns_cache_misses += 1
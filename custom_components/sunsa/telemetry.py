@@ -0,0 +1,105 @@
+
+
+"""Runtime performance telemetry for the Sunsa integration."""
+
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Any
+
+from .const import TELEMETRY_WINDOW
+
+
+class RollingHistogram:
+    """Window of the latest samples of a measurement."""
+
+    __slots__ = ("_samples", "total")
+
+    def __init__(self, size: int = TELEMETRY_WINDOW) -> None:
+        """Initialize an empty window."""
+        self._samples: deque[float] = deque(maxlen=size)
+        # Number of samples ever added
+        self.total = 0
+
+    def add(self, value: float) -> None:
+        """Add a sample, dropping the oldest one if the window is full."""
+        self._samples.append(value)
+        self.total += 1
+
+    def percentile(self, percent: float) -> float | None:
+        """Return the nearest-rank percentile of the samples."""
+        if not self._samples:
+            return None
+        samples = sorted(self._samples)
+        return samples[min(len(samples) - 1, int(len(samples) * percent / 100))]
+
+    def summary(self, since: int = 0) -> dict[str, Any]:
+        """Return the count, extremes, mean and main percentiles of the samples.
+
+        Only the samples added after the total was `since` are summarized, as far
+        as they are still in the window.
+        """
+        if not (last := min(self.total - since, len(self._samples))):
+            return {"count": 0}
+        samples = sorted(self._samples[index] for index in range(-last, 0))
+        count = len(samples)
+        return {
+            "count": count,
+            "min": samples[0],
+            "p50": samples[count // 2],
+            "p95": samples[min(count - 1, count * 95 // 100)],
+            "p99": samples[min(count - 1, count * 99 // 100)],
+            "max": samples[-1],
+            "mean": sum(samples) / count,
+        }
+
+
+class SunsaTelemetry:
+    """Latencies, sizes and error counts of the hot paths of an account.
+
+    Durations are in seconds and sizes in bytes. Recording a sample is a deque
+    append, summaries are only computed when read.
+    """
+
+    def __init__(self) -> None:
+        """Initialize empty measurements."""
+        self.poll_latency = RollingHistogram()
+        self.payload_size = RollingHistogram()
+        self.parse_time = RollingHistogram()
+        self.fan_out_time = RollingHistogram()
+        self.command_latency = RollingHistogram()
+        self.polls = 0
+        self.poll_errors = 0
+        self.poll_timeouts = 0
+        self.command_errors = 0
+        self.command_timeouts = 0
+
+    @property
+    def histograms(self) -> dict[str, RollingHistogram]:
+        """Return the histograms by name."""
+        return {
+            "poll_latency": self.poll_latency,
+            "payload_size": self.payload_size,
+            "parse_time": self.parse_time,
+            "fan_out_time": self.fan_out_time,
+            "command_latency": self.command_latency,
+        }
+
+    def mark(self) -> dict[str, int]:
+        """Return the sample totals, to later summarize the samples since then."""
+        return {name: histogram.total for name, histogram in self.histograms.items()}
+
+    def as_dict(self, since: dict[str, int] | None = None) -> dict[str, Any]:
+        """Return the summary of every measurement, or of those since a mark."""
+        return {
+            **{
+                name: histogram.summary(since[name] if since else 0)
+                for name, histogram in self.histograms.items()
+            },
+            "polls": self.polls,
+            "poll_errors": self.poll_errors,
+            "poll_timeouts": self.poll_timeouts,
+            "command_errors": self.command_errors,
+            "command_timeouts": self.command_timeouts,
+        }
@@ -0,0 +1,103 @@
+"""Fixtures of the Sunsa tests."""
+
+
+from __future__ import annotations
+
+from collections.abc import AsyncGenerator
+from typing import Any
+from unittest.mock import AsyncMock
+
+import pytest
+
+from homeassistant.config_entries import current_entry
+from homeassistant.const import CONF_API_KEY, CONF_EMAIL
+from homeassistant.core import HomeAssistant
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.sunsa.const import DOMAIN, USER_ID
+from custom_components.sunsa.coordinator import SunsaDataUpdateCoordinator
+from custom_components.sunsa.governor import async_release_governor
+from custom_components.sunsa.models import SunsaDevice
+
+pytest_plugins = "pytest_homeassistant_custom_component"
+
+
+class FakeClock:
+    """Monotonic clock advanced by hand."""
+
+    def __init__(self) -> None:
+        """Start the clock."""
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        """Return the current time."""
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        """Move the clock forward."""
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    """Drive the clock of the governor and of the coordinator."""
+    fake_clock = FakeClock()
+    monkeypatch.setattr("custom_components.sunsa.governor.monotonic", fake_clock)
+    monkeypatch.setattr("custom_components.sunsa.coordinator.monotonic", fake_clock)
+    return fake_clock
+
+
+def device_payload(id_device: int, **values: Any) -> dict[str, Any]:
+    """Return the API payload of a horizontal wand, with the given values."""
+    return {
+        "idDevice": id_device,
+        "name": f"Wand {id_device}",
+        "isConnected": True,
+        "position": 0,
+        "batteryPercentage": 80,
+        "temperature": {"value": 20.0, "unit": "C"},
+        "blindType": {"text": "Horizontal"},
+        "defaultSmartHomeDirection": {"text": "Down"},
+        **values,
+    }
+
+
+def devices(positions: dict[int, int | None]) -> dict[int, SunsaDevice]:
+    """Return the data of wands at the given positions."""
+    return {
+        id_device: SunsaDevice.from_payload(
+            device_payload(id_device, position=position)
+        )
+        for id_device, position in positions.items()
+    }
+
+
+@pytest.fixture
+def payloads() -> list[dict[str, Any]]:
+    """Return the device payloads polled from the account, changed by the tests."""
+    return [device_payload(1), device_payload(2)]
+
+
+@pytest.fixture
+async def coordinator(
+    hass: HomeAssistant,
+    payloads: list[dict[str, Any]]
+) -> AsyncGenerator[SunsaDataUpdateCoordinator, None]:
+    """Return the coordinator of an account whose polls return the payloads."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title="test@example.com",
+        unique_id="test@example.com",
+        data={CONF_EMAIL: "test@example.com", USER_ID: 1, CONF_API_KEY: "key"},
+    )
+    entry.add_to_hass(hass)
+    # As while setting up the entry
+    current_entry.set(entry)
+    coordinator = SunsaDataUpdateCoordinator(hass, entry)
+    coordinator.governor.async_get_devices = AsyncMock(
+        side_effect=lambda: [dict(payload) for payload in payloads]
+    )
+    yield coordinator
+    await coordinator.async_shutdown()
+    await async_release_governor(hass, 1)
@@ -0,0 +1,182 @@
+"""Tests of the data update coordinator of the Sunsa integration."""
+
+
+from __future__ import annotations
+
+from typing import Any
+
+from pysunsa.exceptions import PysunsaError
+import pytest
+
+from custom_components.sunsa.const import FAST_POLL_WINDOW, UPDATE_INTERVAL_BACKOFF
+from custom_components.sunsa.coordinator import (
+    SunsaDataUpdateCoordinator,
+    poll_slot_delay,
+)
+
+from .conftest import FakeClock, device_payload
+
+
+async def test_fast_polling_until_target_reached(
+    coordinator: SunsaDataUpdateCoordinator,
+    payloads: list[dict[str, Any]],
+    clock: FakeClock
+) -> None:
+    """Test that polls are fast until the target is reached, then back off."""
+    await coordinator.async_refresh()
+    assert coordinator.update_interval == coordinator.idle_update_interval
+
+    coordinator.async_track_command(1, 60)
+    assert coordinator.update_interval == coordinator.fast_update_interval
+    payloads[0]["position"] = 30
+    await coordinator.async_refresh()
+    assert coordinator.update_interval == coordinator.fast_update_interval
+
+    payloads[0]["position"] = 60
+    intervals = []
+    while coordinator.update_interval != coordinator.idle_update_interval:
+        await coordinator.async_refresh()
+        intervals.append(coordinator.update_interval)
+
+    assert coordinator.pending_targets == {}
+    fast = coordinator.fast_update_interval
+    assert intervals == [
+        fast * UPDATE_INTERVAL_BACKOFF,
+        fast * UPDATE_INTERVAL_BACKOFF ** 2,
+        fast * UPDATE_INTERVAL_BACKOFF ** 3,
+        fast * UPDATE_INTERVAL_BACKOFF ** 4,
+        coordinator.idle_update_interval,
+    ]
+
+
+async def test_fast_polling_ends_after_window(
+    coordinator: SunsaDataUpdateCoordinator,
+    clock: FakeClock
+) -> None:
+    """Test that a target never reached stops fast polling after the window."""
+    await coordinator.async_refresh()
+    coordinator.async_track_command(1, 60)
+
+    clock.advance(FAST_POLL_WINDOW.total_seconds())
+    await coordinator.async_refresh()
+
+    assert coordinator.pending_targets == {}
+    assert coordinator.update_interval == (
+        coordinator.fast_update_interval * UPDATE_INTERVAL_BACKOFF
+    )
+
+
+async def test_only_changed_devices_notified(
+    coordinator: SunsaDataUpdateCoordinator,
+    payloads: list[dict[str, Any]]
+) -> None:
+    """Test that listeners of a device are only updated when it changed."""
+    await coordinator.async_refresh()
+    updates: list[int | None] = []
+    for context in (1, 2, None):
+        coordinator.async_add_listener(
+            lambda context=context: updates.append(context), context
+        )
+
+    await coordinator.async_refresh()
+    assert coordinator.changed_device_ids == set()
+    assert updates == [None]
+
+    updates.clear()
+    payloads[1]["batteryPercentage"] = 79
+    await coordinator.async_refresh()
+    assert coordinator.changed_device_ids == {2}
+    assert updates == [2, None]
+
+
+async def test_availability_change_notifies_all(
+    coordinator: SunsaDataUpdateCoordinator
+) -> None:
+    """Test that every listener is updated when polls start or stop failing."""
+    await coordinator.async_refresh()
+    updates: list[int | None] = []
+    for context in (1, 2):
+        coordinator.async_add_listener(
+            lambda context=context: updates.append(context), context
+        )
+
+    coordinator.governor.async_get_devices.side_effect = PysunsaError(500)
+    await coordinator.async_refresh()
+    assert not coordinator.last_update_success
+    assert updates == [1, 2]
+
+    await coordinator.async_refresh()
+    assert updates == [1, 2]
+
+
+async def test_added_and_removed_devices(
+    coordinator: SunsaDataUpdateCoordinator,
+    payloads: list[dict[str, Any]]
+) -> None:
+    """Test that devices joining or leaving the account are diffed."""
+    await coordinator.async_refresh()
+    added: list[set[int]] = []
+    coordinator.async_add_device_listener(lambda ids: added.append(set(ids)))
+    coordinator.async_add_listener(lambda: None)
+
+    payloads[1:] = [device_payload(3)]
+    await coordinator.async_refresh()
+
+    assert coordinator.changed_device_ids == {2, 3}
+    assert set(coordinator.data) == {1, 3}
+    assert added == [{3}]
+
+
+async def test_push_expires_unreached_targets(
+    coordinator: SunsaDataUpdateCoordinator,
+    payloads: list[dict[str, Any]],
+    clock: FakeClock
+) -> None:
+    """Test that targets not reached while pushing expire and polls stay full."""
+    await coordinator.async_refresh()
+    coordinator.async_handle_push([device_payload(1)])
+    assert coordinator.push_active
+
+    coordinator.async_track_command(1, 40)
+    coordinator.async_handle_push([device_payload(1, position=38)])
+    assert coordinator.pending_targets == {1: 40}
+
+    clock.advance(FAST_POLL_WINDOW.total_seconds())
+    assert coordinator.pending_targets == {}
+
+    payloads[1]["position"] = 60
+    payloads.append(device_payload(3))
+    await coordinator.async_refresh()
+    assert coordinator.update_interval == coordinator.push_consistency_interval
+    assert coordinator.data[2].position == 60
+    assert 3 in coordinator.data
+
+
+@pytest.mark.parametrize(
+    ("now", "index", "count", "delay"),
+    [
+        (0, 0, 1, 60),
+        (45, 0, 1, 75),
+        (0, 1, 3, 80),
+        (50, 1, 3, 30),
+        (100, 2, 3, 60),
+    ],
+)
+def test_poll_slot_delay(now: float, index: int, count: int, delay: float) -> None:
+    """Test the wait until the first slot at least half an interval away."""
+    assert poll_slot_delay(now, index, count, 60) == pytest.approx(delay)
+
+
+@pytest.mark.parametrize("count", [1, 2, 7])
+def test_poll_slots_spread(count: int) -> None:
+    """Test that the slots of the accounts are evenly spread and repeat."""
+    interval = 60
+    for now in (0, 13.5, 1e6 + 0.25):
+        slots = []
+        for index in range(count):
+            delay = poll_slot_delay(now, index, count, interval)
+            assert interval / 2 <= delay < interval * 1.5
+            slots.append((now + delay) % interval)
+        assert sorted(slots) == pytest.approx(
+            [index * interval / count for index in range(count)], abs=1e-6
+        )
@@ -0,0 +1,161 @@
+"""Tests of the command dispatcher of the Sunsa integration."""
+
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from unittest.mock import AsyncMock, Mock, call
+
+from pysunsa.exceptions import PysunsaError
+import pytest
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.sunsa.dispatcher import SunsaCommandDispatcher
+from custom_components.sunsa.journal import SunsaCommandJournal
+from custom_components.sunsa.telemetry import SunsaTelemetry
+
+
+@pytest.fixture(autouse=True)
+def short_debounce(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Shorten the debounce window of the commands."""
+    monkeypatch.setattr("custom_components.sunsa.dispatcher.COMMAND_DEBOUNCE", 0.01)
+
+
+@pytest.fixture
+def governor() -> Mock:
+    """Return a governor delivering every command."""
+    return Mock(async_update_device=AsyncMock())
+
+
+@pytest.fixture
+def on_command_sent() -> Mock:
+    """Return the callback of the delivered commands."""
+    return Mock()
+
+
+@pytest.fixture
+def telemetry() -> SunsaTelemetry:
+    """Return the telemetry of the account."""
+    return SunsaTelemetry()
+
+
+@pytest.fixture
+def dispatcher(
+    hass: HomeAssistant,
+    governor: Mock,
+    telemetry: SunsaTelemetry,
+    on_command_sent: Mock
+) -> Callable[..., SunsaCommandDispatcher]:
+    """Return a factory of dispatchers sending through the governor."""
+
+    def create(
+        max_concurrency: int = 5,
+        journal: SunsaCommandJournal | None = None
+    ) -> SunsaCommandDispatcher:
+        """Create a dispatcher."""
+        return SunsaCommandDispatcher(
+            hass,
+            governor,
+            telemetry,
+            max_concurrency=max_concurrency,
+            on_command_sent=on_command_sent,
+            journal=journal,
+        )
+
+    return create
+
+
+async def test_commands_to_a_device_coalesce(
+    dispatcher: Callable[..., SunsaCommandDispatcher],
+    governor: Mock,
+    on_command_sent: Mock
+) -> None:
+    """Test that only the last position within the debounce window is sent."""
+    command_dispatcher = dispatcher()
+
+    results = await asyncio.gather(
+        command_dispatcher.async_move(1, 20),
+        command_dispatcher.async_move(1, 60),
+        command_dispatcher.async_move(2, 20),
+    )
+
+    assert [(result.position, result.success) for result in results] == [
+        (60, True), (60, True), (20, True)
+    ]
+    assert command_dispatcher.commands_coalesced == 1
+    governor.async_update_device.assert_has_awaits(
+        [call(1, 60), call(2, 20)], any_order=True
+    )
+    assert governor.async_update_device.await_count == 2
+    assert on_command_sent.call_count == 2
+
+
+async def test_commands_after_the_window_are_sent(
+    dispatcher: Callable[..., SunsaCommandDispatcher],
+    governor: Mock
+) -> None:
+    """Test that a command sent after the window isn't coalesced."""
+    command_dispatcher = dispatcher()
+
+    await command_dispatcher.async_move(1, 20)
+    await command_dispatcher.async_move(1, 60)
+
+    assert command_dispatcher.commands_coalesced == 0
+    assert governor.async_update_device.await_count == 2
+
+
+async def test_concurrency_is_bounded(
+    dispatcher: Callable[..., SunsaCommandDispatcher],
+    governor: Mock
+) -> None:
+    """Test that no more commands than the limit are in flight."""
+    command_dispatcher = dispatcher(max_concurrency=2)
+    in_flight = peak = 0
+
+    async def update_device(sunsa_device_id: int, position: int) -> None:
+        """Take a while to deliver a command."""
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+
+    governor.async_update_device.side_effect = update_device
+
+    results = await command_dispatcher.async_move_many(
+        {sunsa_device_id: 50 for sunsa_device_id in range(1, 6)}
+    )
+
+    assert all(result.success for result in results.values())
+    assert peak == 2
+
+
+@pytest.mark.parametrize(
+    ("status_code", "queued"),
+    [(503, True), (404, False)],
+)
+async def test_failed_commands_are_journaled_if_transient(
+    hass: HomeAssistant,
+    dispatcher: Callable[..., SunsaCommandDispatcher],
+    governor: Mock,
+    telemetry: SunsaTelemetry,
+    on_command_sent: Mock,
+    status_code: int,
+    queued: bool
+) -> None:
+    """Test that only commands that may succeed later are journaled."""
+    journal = SunsaCommandJournal(hass, "entry")
+    command_dispatcher = dispatcher(journal=journal)
+    governor.async_update_device.side_effect = PysunsaError(
+        status_code
+    )
+
+    result = await command_dispatcher.async_move(1, 60)
+
+    assert not result.success
+    assert result.queued is queued
+    assert journal.positions == ({1: 60} if queued else {})
+    assert telemetry.command_errors == 1
+    on_command_sent.assert_not_called()
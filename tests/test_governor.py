@@ -0,0 +1,260 @@
+"""Tests of the request governor of the Sunsa integration."""
+
+
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+from aiohttp import ClientConnectionError, ClientResponseError
+from pysunsa.exceptions import PysunsaError
+import pytest
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.sunsa.const import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_OPEN_DELAY,
+    CIRCUIT_MAX_OPEN_DELAY,
+    RATE_LIMITED_DELAY,
+    REQUEST_RETRIES,
+)
+from custom_components.sunsa.governor import (
+    CircuitBreaker,
+    CircuitOpenError,
+    CircuitState,
+    SunsaRequestGovernor,
+    TokenBucket,
+    is_transient_error,
+)
+
+from .conftest import FakeClock
+
+
+def open_circuit(circuit_breaker: CircuitBreaker) -> None:
+    """Fail enough requests to open the circuit."""
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD):
+        circuit_breaker.async_record_failure()
+
+
+def test_circuit_opens_after_consecutive_failures(clock: FakeClock) -> None:
+    """Test that the circuit only opens after the failure threshold."""
+    circuit_breaker = CircuitBreaker()
+    states = []
+    circuit_breaker.async_add_listener(states.append)
+
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD - 1):
+        circuit_breaker.async_record_failure()
+    assert circuit_breaker.state is CircuitState.CLOSED
+    assert circuit_breaker.async_before_request() is False
+
+    circuit_breaker.async_record_failure()
+    assert circuit_breaker.state is CircuitState.OPEN
+    assert states == [CircuitState.OPEN]
+    with pytest.raises(CircuitOpenError) as error:
+        circuit_breaker.async_before_request()
+    assert error.value.retry_in == CIRCUIT_OPEN_DELAY
+
+
+def test_circuit_success_resets_failures(clock: FakeClock) -> None:
+    """Test that failures must be consecutive to open the circuit."""
+    circuit_breaker = CircuitBreaker()
+
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD - 1):
+        circuit_breaker.async_record_failure()
+    circuit_breaker.async_record_success()
+    circuit_breaker.async_record_failure()
+
+    assert circuit_breaker.state is CircuitState.CLOSED
+
+
+def test_circuit_probe_success_closes(clock: FakeClock) -> None:
+    """Test that a single probe is let through and closes the circuit."""
+    circuit_breaker = CircuitBreaker()
+    open_circuit(circuit_breaker)
+
+    clock.advance(CIRCUIT_OPEN_DELAY)
+    assert circuit_breaker.async_before_request() is True
+    assert circuit_breaker.state is CircuitState.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        circuit_breaker.async_before_request()
+
+    circuit_breaker.async_record_success()
+    assert circuit_breaker.state is CircuitState.CLOSED
+    assert circuit_breaker.async_before_request() is False
+
+
+def test_circuit_probe_failure_backs_off(clock: FakeClock) -> None:
+    """Test that failed probes double the open delay up to the maximum."""
+    circuit_breaker = CircuitBreaker()
+    open_circuit(circuit_breaker)
+
+    delay = CIRCUIT_OPEN_DELAY
+    while delay < CIRCUIT_MAX_OPEN_DELAY:
+        clock.advance(delay)
+        assert circuit_breaker.async_before_request() is True
+        circuit_breaker.async_record_failure()
+        delay = min(delay * 2, CIRCUIT_MAX_OPEN_DELAY)
+        assert circuit_breaker.state is CircuitState.OPEN
+        assert circuit_breaker.retry_in == delay
+
+    clock.advance(delay)
+    circuit_breaker.async_before_request()
+    circuit_breaker.async_record_failure()
+    assert circuit_breaker.retry_in == CIRCUIT_MAX_OPEN_DELAY
+
+
+def test_circuit_aborted_probe_reopens(clock: FakeClock) -> None:
+    """Test that a probe without an outcome lets the next request probe."""
+    circuit_breaker = CircuitBreaker()
+    open_circuit(circuit_breaker)
+    clock.advance(CIRCUIT_OPEN_DELAY)
+    assert circuit_breaker.async_before_request() is True
+
+    circuit_breaker.async_abort_probe()
+
+    assert circuit_breaker.state is CircuitState.OPEN
+    assert circuit_breaker.async_before_request() is True
+
+
+def test_circuit_abort_probe_ignored_when_closed(clock: FakeClock) -> None:
+    """Test that aborting a probe doesn't open a closed circuit."""
+    circuit_breaker = CircuitBreaker()
+
+    circuit_breaker.async_abort_probe()
+
+    assert circuit_breaker.state is CircuitState.CLOSED
+
+
+def test_token_bucket_burst_and_refill(clock: FakeClock) -> None:
+    """Test that the bucket allows a burst, then refills at its rate."""
+    bucket = TokenBucket(rate=2, capacity=3)
+
+    assert [bucket.try_take() for _ in range(4)] == [True, True, True, False]
+    assert bucket.delay() == 0.5
+
+    clock.advance(0.25)
+    assert not bucket.try_take()
+    assert bucket.delay() == 0.25
+
+    clock.advance(0.25)
+    assert bucket.try_take()
+    assert not bucket.try_take()
+
+
+def test_token_bucket_capacity(clock: FakeClock) -> None:
+    """Test that idle time doesn't accrue tokens beyond the capacity."""
+    bucket = TokenBucket(rate=2, capacity=3)
+    for _ in range(3):
+        bucket.try_take()
+
+    clock.advance(60)
+
+    assert [bucket.try_take() for _ in range(4)] == [True, True, True, False]
+
+
+def test_token_bucket_rate_change(clock: FakeClock) -> None:
+    """Test that a new rate applies to the following refills."""
+    bucket = TokenBucket(rate=2, capacity=1)
+    bucket.try_take()
+
+    bucket.rate = 0.5
+
+    assert bucket.delay() == 2
+
+
+@pytest.mark.parametrize("expected_lingering_timers", [True])
+@pytest.mark.parametrize("deferred", [False, True], ids=["in_request", "queued"])
+async def test_cancelled_probe_reopens_circuit(
+    hass: HomeAssistant,
+    clock: FakeClock,
+    deferred: bool
+) -> None:
+    """Test that a cancelled probe doesn't leave the circuit half open."""
+    governor = SunsaRequestGovernor(hass, 1, "key")
+    governor.sunsa = Mock(get_devices=Mock(side_effect=asyncio.Event().wait))
+    open_circuit(governor.circuit_breaker)
+    clock.advance(CIRCUIT_OPEN_DELAY)
+    if deferred:
+        governor.async_defer(60)
+
+    probe = hass.async_create_task(governor.async_get_devices())
+    await asyncio.sleep(0)
+    assert governor.circuit_breaker.state is CircuitState.HALF_OPEN
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+
+    assert governor.circuit_breaker.state is CircuitState.OPEN
+    assert governor.circuit_breaker.async_before_request() is True
+    await governor.session.async_close()
+
+
+@pytest.mark.parametrize(
+    ("error", "transient"),
+    [
+        (PysunsaError(500), True),
+        (PysunsaError(429), True),
+        (PysunsaError(401), False),
+        (TimeoutError(), True),
+        (ClientConnectionError(), True),
+        (ClientResponseError(Mock(), (), status=503), True),
+        (ClientResponseError(Mock(), (), status=404), False),
+        (ValueError(), False),
+    ],
+)
+def test_is_transient_error(error: Exception, transient: bool) -> None:
+    """Test which errors are retried and count toward opening the circuit."""
+    assert is_transient_error(error) is transient
+
+
+async def test_connection_errors_open_circuit(
+    hass: HomeAssistant,
+    monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that unreachable cloud errors are retried, then open the circuit."""
+    # Retries without backoff delay
+    monkeypatch.setattr("custom_components.sunsa.governor.REQUEST_RETRY_DELAY", 0)
+    governor = SunsaRequestGovernor(hass, 1, "key")
+    governor.async_set_rate(1000)
+    governor.sunsa = Mock(get_devices=Mock(side_effect=ClientConnectionError))
+
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD):
+        with pytest.raises(ClientConnectionError):
+            await governor.async_get_devices()
+
+    assert governor.sunsa.get_devices.call_count == CIRCUIT_FAILURE_THRESHOLD * (
+        REQUEST_RETRIES + 1
+    )
+    assert governor.circuit_breaker.state is CircuitState.OPEN
+    await governor.session.async_close()
+
+
+@pytest.mark.parametrize(
+    ("retry_after", "deferred"),
+    [(None, RATE_LIMITED_DELAY), (2, 2)],
+    ids=["default", "retry_after"],
+)
+async def test_rate_limited_defers_requests(
+    hass: HomeAssistant,
+    clock: FakeClock,
+    retry_after: float | None,
+    deferred: float
+) -> None:
+    """Test that the default delay only applies without Retry-After."""
+    governor = SunsaRequestGovernor(hass, 1, "key")
+
+    async def get_devices() -> None:
+        """Fail as rate limited, deferring as the session would on Retry-After."""
+        if retry_after is not None:
+            governor.session.stats.retry_afters += 1
+            governor.async_defer(retry_after)
+        raise PysunsaError(429)
+
+    governor.sunsa = Mock(get_devices=AsyncMock(side_effect=get_devices))
+
+    with pytest.raises(PysunsaError):
+        await governor.async_get_devices(retries=0)
+
+    assert governor._deferred_until == clock.now + deferred
+    await governor.session.async_close()
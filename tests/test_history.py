@@ -0,0 +1,55 @@
+"""Tests of the wand history of the Sunsa integration."""
+
+
+from __future__ import annotations
+
+from unittest.mock import Mock
+
+import pytest
+
+from custom_components.sunsa.const import HISTORY_SIZE
+from custom_components.sunsa.history import SECONDS_PER_DAY, WandHistory
+
+
+def sample(history: WandHistory, timestamp: float, battery: int) -> None:
+    """Add a sample of a wand with the given battery percentage."""
+    history.add(timestamp, Mock(battery_percentage=battery, temperature=20.0))
+
+
+def test_drain_rate() -> None:
+    """Test the battery drain fitted since the last recharge."""
+    history = WandHistory()
+    sample(history, 0, 40)
+    for day in range(3):
+        sample(history, (day + 1) * SECONDS_PER_DAY, 90 - 2 * day)
+
+    assert history.drain_rate == pytest.approx(2)
+    assert history.days_to_empty(86) == pytest.approx(43)
+
+
+def test_restore_round_trip() -> None:
+    """Test that a restored history keeps its samples and wraps around."""
+    history = WandHistory()
+    for hour in range(HISTORY_SIZE + 5):
+        sample(history, hour * 3600, 100 - hour // 24)
+
+    restored = WandHistory.from_dict(history.as_dict())
+
+    assert restored.as_dict() == history.as_dict()
+    assert restored.drain_rate == pytest.approx(history.drain_rate)
+
+
+@pytest.mark.parametrize(
+    "stored",
+    [
+        {"samples": "AAAA"},
+        {"index": HISTORY_SIZE},
+        {"index": -1},
+        {"count": HISTORY_SIZE + 1},
+    ],
+    ids=["samples_size", "index_past_end", "negative_index", "count"],
+)
+def test_restore_rejects_other_size(stored: dict) -> None:
+    """Test that histories of another size are rejected, not resized."""
+    with pytest.raises(ValueError):
+        WandHistory.from_dict(WandHistory().as_dict() | stored)
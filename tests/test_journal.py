@@ -0,0 +1,76 @@
+"""Tests of the command journal of the Sunsa integration."""
+
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.sunsa.const import DOMAIN, JOURNAL_MAX_REPLAYS, STORAGE_VERSION
+from custom_components.sunsa.journal import SunsaCommandJournal
+
+from .conftest import devices
+
+
+async def test_latest_command_per_device(hass: HomeAssistant) -> None:
+    """Test that a device's journaled commands collapse to the latest one."""
+    journal = SunsaCommandJournal(hass, "entry")
+    journal.async_record(1, 20)
+    journal.async_record(1, 60)
+    journal.async_record(2, -100)
+
+    assert journal.async_pop_pending(devices({1: 0, 2: 0})) == {1: 60, 2: -100}
+    assert journal.positions == {}
+
+
+async def test_pending_skips_reached_and_gone_devices(hass: HomeAssistant) -> None:
+    """Test that commands to devices at their target or gone are dropped."""
+    journal = SunsaCommandJournal(hass, "entry")
+    journal.async_record(1, 60)
+    journal.async_record(2, 60)
+    journal.async_record(3, 60)
+
+    assert journal.async_pop_pending(devices({1: 60, 2: 0})) == {2: 60}
+
+
+async def test_replays_are_capped(hass: HomeAssistant) -> None:
+    """Test that a command failing every replay is eventually given up."""
+    journal = SunsaCommandJournal(hass, "entry")
+    journal.async_record(1, 60)
+    data = devices({1: 0})
+
+    for _ in range(JOURNAL_MAX_REPLAYS):
+        assert journal.async_pop_pending(data) == {1: 60}
+        # Journaled again by the dispatcher as the replay failed
+        journal.async_record(1, 60)
+
+    assert journal.async_pop_pending(data) == {}
+    assert journal.replays == {}
+
+
+async def test_delivered_command_resets_replays(hass: HomeAssistant) -> None:
+    """Test that a delivered command drops the journaled one and its replays."""
+    journal = SunsaCommandJournal(hass, "entry")
+    journal.async_record(1, 60)
+    journal.async_pop_pending(devices({1: 0}))
+    journal.async_record(1, 60)
+
+    journal.async_discard(1)
+
+    assert journal.positions == {}
+    assert journal.replays == {}
+
+
+async def test_load(hass: HomeAssistant, hass_storage: dict[str, Any]) -> None:
+    """Test that journaled commands and their replays survive a restart."""
+    hass_storage[f"{DOMAIN}.entry.journal"] = {
+        "version": STORAGE_VERSION,
+        "data": {"positions": {"1": 60}, "replays": {"1": 2}},
+    }
+    journal = SunsaCommandJournal(hass, "entry")
+
+    await journal.async_load()
+
+    assert journal.positions == {1: 60}
+    assert journal.replays == {1: 2}
@@ -0,0 +1,109 @@
+"""Tests of the device model of the Sunsa integration."""
+
+
+from __future__ import annotations
+
+import pytest
+
+from custom_components.sunsa.models import SunsaDevice
+
+from .conftest import device_payload
+
+
+def test_from_payload() -> None:
+    """Test the values parsed and derived from a payload."""
+    device = SunsaDevice.from_payload(device_payload(7, position=-40))
+
+    assert device.id == 7
+    assert device.name == "Wand 7"
+    assert device.is_connected
+    assert device.position == -40
+    assert device.battery_percentage == 80
+    assert device.temperature == 20.0
+    assert device.blind_type == "horizontal"
+    assert device.default_smart_home_direction == "down"
+    assert device.orientation == "horizontal"
+    assert device.closing_direction == 1
+    assert device.cover_position == 60
+    assert device.icon == "mdi:blinds-horizontal"
+
+
+@pytest.mark.parametrize(
+    ("blind_type", "direction", "orientation", "closing_direction"),
+    [
+        ("Vertical", "Right", "vertical", 1),
+        ("Vertical", "Left", "vertical", -1),
+        ("Horizontal", "Up", "horizontal", -1),
+    ],
+)
+def test_orientation_and_closing_direction(
+    blind_type: str,
+    direction: str,
+    orientation: str,
+    closing_direction: int
+) -> None:
+    """Test the orientation and closing direction of each kind of blind."""
+    device = SunsaDevice.from_payload(device_payload(
+        1,
+        blindType={"text": blind_type},
+        defaultSmartHomeDirection={"text": direction},
+    ))
+
+    assert device.orientation == orientation
+    assert device.closing_direction == closing_direction
+
+
+@pytest.mark.parametrize("position", [100, -100])
+def test_closed_icon(position: int) -> None:
+    """Test that closed blinds in either direction get the closed icon."""
+    device = SunsaDevice.from_payload(device_payload(1, position=position))
+
+    assert device.cover_position == 0
+    assert device.icon == "mdi:blinds-horizontal-closed"
+
+
+def test_missing_values() -> None:
+    """Test that values a wand doesn't report are None."""
+    payload = device_payload(1, position=None, temperature=None, isConnected=None)
+    del payload["batteryPercentage"]
+
+    device = SunsaDevice.from_payload(payload)
+
+    assert device.position is None
+    assert device.cover_position is None
+    assert device.battery_percentage is None
+    assert device.temperature is None
+    assert not device.is_connected
+
+
+@pytest.mark.parametrize(
+    ("values", "error"),
+    [
+        ({"blindType": None}, TypeError),
+        ({"position": "half"}, ValueError),
+        ({"idDevice": "wand"}, ValueError),
+    ],
+)
+def test_unexpected_payload(values: dict, error: type[Exception]) -> None:
+    """Test that payloads of an unexpected shape raise."""
+    with pytest.raises(error):
+        SunsaDevice.from_payload(device_payload(1, **values))
+
+
+def test_missing_name() -> None:
+    """Test that a payload without a required key raises KeyError."""
+    payload = device_payload(1)
+    del payload["name"]
+
+    with pytest.raises(KeyError):
+        SunsaDevice.from_payload(payload)
+
+
+def test_devices_compare_by_value() -> None:
+    """Test that unchanged payloads parse to equal devices, as diffing relies on."""
+    assert SunsaDevice.from_payload(device_payload(1)) == SunsaDevice.from_payload(
+        device_payload(1)
+    )
+    assert SunsaDevice.from_payload(device_payload(1)) != SunsaDevice.from_payload(
+        device_payload(1, batteryPercentage=79)
+    )
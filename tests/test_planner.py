@@ -0,0 +1,122 @@
+"""Tests of the sun tracking planner of the Sunsa integration."""
+
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+from unittest.mock import AsyncMock
+
+import numpy as np
+import pytest
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.sunsa.coordinator import SunsaDataUpdateCoordinator
+from custom_components.sunsa.dispatcher import SunsaCommandResult
+from custom_components.sunsa.planner import SUN_ENTITY_ID, plan_positions
+
+
+def plan(
+    sun_azimuth: float,
+    sun_elevation: float,
+    window_azimuth: float,
+    vertical: bool = False,
+    closing_direction: int = 1
+) -> int:
+    """Return the planned position of a single window."""
+    return int(plan_positions(
+        sun_azimuth,
+        sun_elevation,
+        np.array([window_azimuth]),
+        np.array([vertical]),
+        np.array([closing_direction]),
+    )[0])
+
+
+@pytest.mark.parametrize(
+    ("sun_elevation", "position"),
+    [(1, 98), (20, 56), (30, 33), (45, 0), (60, 0)],
+)
+def test_horizontal_slats_cutoff(sun_elevation: float, position: int) -> None:
+    """Test that horizontal slats tilt to 90 - 2 * the sun elevation."""
+    assert plan(180, sun_elevation, 180) == position
+
+
+def test_horizontal_slats_profile_angle() -> None:
+    """Test that the sun off the window normal raises the profile angle."""
+    # tan(profile) = tan(30) / cos(60), a profile angle of about 49 degrees
+    assert plan(240, 30, 180) == 0
+    assert plan(200, 30, 180) == plan(160, 30, 180) < plan(180, 30, 180)
+
+
+@pytest.mark.parametrize(
+    ("sun_azimuth", "position"),
+    [(180, 100), (150, 33), (215, 22), (135, 0), (100, 0)],
+)
+def test_vertical_slats_cutoff(sun_azimuth: float, position: int) -> None:
+    """Test that vertical slats tilt to 90 - 2 * the sun's angle to the window."""
+    assert plan(sun_azimuth, 30, 180, vertical=True) == position
+
+
+@pytest.mark.parametrize("sun_azimuth", [270, 90, 0, 359])
+@pytest.mark.parametrize("vertical", [False, True])
+def test_windows_facing_away_open(sun_azimuth: float, vertical: bool) -> None:
+    """Test that windows the sun doesn't shine on are opened."""
+    assert plan(sun_azimuth, 10, 180, vertical=vertical) == 0
+
+
+def test_closing_direction_and_wrap_around() -> None:
+    """Test the closing direction and azimuths across north."""
+    assert plan(180, 30, 180, closing_direction=-1) == -33
+    assert plan(10, 30, 350, vertical=True) == plan(330, 30, 350, vertical=True) == 56
+
+
+async def test_sun_tracking_threshold(
+    hass: HomeAssistant,
+    coordinator: SunsaDataUpdateCoordinator,
+    payloads: list[dict[str, Any]]
+) -> None:
+    """Test that only wands off by more than the threshold are moved."""
+
+    async def move_many(targets: dict[int, int]) -> dict[int, SunsaCommandResult]:
+        """Deliver every command."""
+        return {
+            sunsa_device_id: SunsaCommandResult(sunsa_device_id, position, True, 0)
+            for sunsa_device_id, position in targets.items()
+        }
+
+    coordinator.dispatcher.async_move_many = AsyncMock(side_effect=move_many)
+    await coordinator.async_refresh()
+    tracker = coordinator.sun_tracker
+    tracker.threshold = 5
+    stop = tracker.async_start()
+
+    async def sun(azimuth: float, elevation: float) -> None:
+        """Move the sun and let the planned moves be sent."""
+        hass.states.async_set(
+            SUN_ENTITY_ID,
+            "above_horizon",
+            {"azimuth": azimuth, "elevation": elevation}
+        )
+        await hass.async_block_till_done()
+        await asyncio.sleep(0)
+
+    await sun(180, 30)
+    tracker.async_set_window_azimuth(1, 180)
+    await asyncio.sleep(0)
+    coordinator.dispatcher.async_move_many.assert_awaited_once_with({1: 33})
+
+    # Within the threshold of the delivered position
+    await sun(180, 28)
+    assert coordinator.dispatcher.async_move_many.await_count == 1
+
+    await sun(180, 20)
+    coordinator.dispatcher.async_move_many.assert_awaited_with({1: 56})
+
+    # Not at the delivered position once the coordinator stops waiting for it
+    payloads[0]["position"] = 0
+    await coordinator.async_refresh()
+    await sun(180, 21)
+    coordinator.dispatcher.async_move_many.assert_awaited_with({1: 53})
+    stop()
@@ -0,0 +1,60 @@
+"""Tests of the presets of the Sunsa integration."""
+
+
+from __future__ import annotations
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.sunsa.presets import SunsaPresets
+
+from .conftest import devices
+
+
+async def test_moves_skip_wands_within_tolerance(hass: HomeAssistant) -> None:
+    """Test that only wands off by more than the tolerance are commanded."""
+    presets = SunsaPresets(hass, "entry")
+    presets.async_save_preset("evening", {1: 50, 2: 50, 3: -100})
+
+    targets, skipped = presets.moves(
+        "evening", devices({1: 47, 2: 40, 3: -100}), {}, tolerance=3
+    )
+
+    assert targets == {2: 50}
+    assert skipped == 2
+
+
+async def test_moves_use_expected_positions(hass: HomeAssistant) -> None:
+    """Test that wands heading to their preset position are skipped."""
+    presets = SunsaPresets(hass, "entry")
+    presets.async_save_preset("evening", {1: 50, 2: 50})
+
+    targets, skipped = presets.moves(
+        "evening", devices({1: 0, 2: 50}), {1: 50, 2: 0}, tolerance=0
+    )
+
+    assert targets == {2: 50}
+    assert skipped == 1
+
+
+async def test_moves_leave_out_unknown_positions_and_wands(
+    hass: HomeAssistant
+) -> None:
+    """Test wands without a position and wands no longer in the account."""
+    presets = SunsaPresets(hass, "entry")
+    presets.async_save_preset("evening", {1: 50, 4: 50})
+    targets, skipped = presets.moves(
+        "evening", devices({1: None}), {}, tolerance=100
+    )
+
+    assert targets == {1: 50}
+    assert skipped == 0
+
+
+async def test_delete_preset(hass: HomeAssistant) -> None:
+    """Test that deleting reports whether the preset existed."""
+    presets = SunsaPresets(hass, "entry")
+    presets.async_save_preset("evening", {1: 50})
+
+    assert presets.async_delete_preset("evening")
+    assert not presets.async_delete_preset("evening")
+    assert presets.presets == {}